@@ -1,10 +1,14 @@
 import json
 import logging
+from bson import ObjectId
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from jose import JWTError
 from models.user import User
 from misc.utility import decode_access_token
 from services.wisper_service import realtime_transcription_using_whisper
+from services.session import release_session
+from services.scheduler import stop_scheduler
+from services.transcript_writer import transcript_writer
 from core.common import meetings
 
 # Set up logging
@@ -17,6 +21,12 @@ router = APIRouter()
 async def websocket_endpoint(websocket: WebSocket, meeting_id: str):
     await websocket.accept()
 
+    # Meeting ids name session and index files, so anything but an ObjectId is refused
+    if not ObjectId.is_valid(meeting_id):
+        await websocket.send_text("Invalid meeting id.")
+        await websocket.close(code=1008)
+        return
+
     # Authentication
     token = websocket.query_params.get("token")
     if token is None:
@@ -50,17 +60,19 @@ async def websocket_endpoint(websocket: WebSocket, meeting_id: str):
     username = f"{user.first_name} {user.last_name}"
 
     # Add user to the specified meeting
-    if meeting_id not in meetings:
-        meetings[meeting_id] = []
-    meetings[meeting_id].append({"websocket": websocket, "username": username})
+    subscriber = await meetings.subscribe(meeting_id, websocket, username)
 
     try:
-        # Run transcription service for the user in the specific meeting
-        await realtime_transcription_using_whisper(websocket, user, meeting_id)
+        # Run transcription service for the user in the specific meeting.
+        # Clients opt into binary audio frames with ?protocol=binary; JSON/base64 stays the default
+        await realtime_transcription_using_whisper(subscriber, user, meeting_id, websocket.query_params.get("protocol"))
     except WebSocketDisconnect:
         logger.info(f"Client {user.email} disconnected from meeting {meeting_id}")
     finally:
         # Remove user from the meeting upon disconnection
-        meetings[meeting_id].remove({"websocket": websocket, "username": username})
-        if not meetings[meeting_id]:  # Remove empty meeting
-            del meetings[meeting_id]
+        await meetings.unsubscribe(meeting_id, subscriber)
+        if not meetings.subscribers(meeting_id):
+            # Nobody on this worker is left in the meeting; keep its transcript on disk only
+            stop_scheduler(meeting_id)
+            release_session(meeting_id)
+            await transcript_writer.flush(meeting_id)
@@ -1,13 +1,23 @@
-from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
+import asyncio
+import hashlib
+import uuid
+from fastapi import APIRouter, Request, Depends, HTTPException
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart before 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
 from models.user import User
 from models.meeting import Meeting, MeetingStatus
 from misc.utility import get_current_user
-from services.fais import process_and_index_pdf
+from core.config import settings
+from services.ingestion import ingestion_executor, IngestionQueueFull
+from typing import Dict, Any
 import os
 
 # Define constants and folders
 DOCUMENTS_FOLDER = "documents"
+MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_MB * 1024 * 1024
+PDF_MAGIC = b"%PDF-"
 
 # Ensure the documents folder exists
 os.makedirs(DOCUMENTS_FOLDER, exist_ok=True)
@@ -15,16 +25,158 @@ os.makedirs(DOCUMENTS_FOLDER, exist_ok=True)
 # FastAPI Router setup
 router = APIRouter()
 
-@router.post("/upload/", response_model=str)
-async def document(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    meeting_id: str = Form(...),
-    current_user: User = Depends(get_current_user)
-):
-    # Check if the file is a PDF
-    if file.content_type != "application/pdf":
-        raise HTTPException(status_code=400, detail="Only PDF files are accepted.")
+def upload_too_large():
+    return HTTPException(status_code=413, detail=f"File exceeds the {settings.MAX_UPLOAD_MB} MB upload limit.")
+
+# Text fields are small; anything bigger is not a meeting id
+MAX_FIELD_BYTES = 1024
+
+
+class MultipartUpload:
+    """Incremental multipart/form-data parser that hands out the "file" part as it arrives.
+
+    The body is fed chunk by chunk from the socket, so the file is never spooled by the framework
+    and an upload can be refused after its first block instead of after the whole body.
+    """
+
+    def __init__(self, boundary: bytes):
+        self.fields = {}
+        self.filename = None
+        self.file_content_type = None
+        self.file_blocks = []
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._part_name = None
+        self._part_value = b""
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def feed(self, chunk: bytes):
+        """Parse the next chunk of the body; file data it contained is appended to file_blocks."""
+        self.parser.write(chunk)
+
+    def take_file_blocks(self):
+        blocks, self.file_blocks = self.file_blocks, []
+        return blocks
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._part_name = None
+        self._part_value = b""
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._part_name = options.get(b"name", b"").decode("utf-8", "replace")
+        if self._part_name == "file":
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+            self.file_content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+
+    def _on_part_data(self, data, start, end):
+        if self._part_name == "file":
+            self.file_blocks.append(bytes(data[start:end]))
+        else:
+            self._part_value += data[start:end]
+            if len(self._part_value) > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=400, detail=f"Form field {self._part_name} is too long.")
+
+    def _on_part_end(self):
+        if self._part_name and self._part_name != "file":
+            self.fields[self._part_name] = self._part_value.decode("utf-8", "replace")
+
+
+async def receive_upload(request: Request):
+    """
+    Parse the multipart upload straight off the socket, streaming the PDF to disk in blocks and hashing
+    it on the way. Returns (fields, filename, file_path, doc_hash).
+    Documents are stored by content hash, so a known document is neither stored nor embedded twice.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+    upload = MultipartUpload(options[b"boundary"])
+
+    tmp_path = os.path.join(DOCUMENTS_FOLDER, f".{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    out = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        async for chunk in request.stream():
+            upload.feed(chunk)
+            for block in upload.take_file_blocks():
+                # Check if the file is a PDF, by its declared type and its first bytes
+                if len(head) < len(PDF_MAGIC):
+                    head += block[:len(PDF_MAGIC) - len(head)]
+                    if upload.file_content_type != "application/pdf" or not PDF_MAGIC.startswith(head):
+                        raise HTTPException(status_code=400, detail="Only PDF files are accepted.")
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise upload_too_large()
+                digest.update(block)
+                await asyncio.to_thread(out.write, block)
+        upload.parser.finalize()
+        await asyncio.to_thread(out.close)
+        if upload.filename is None:
+            raise HTTPException(status_code=400, detail="No file was uploaded.")
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+        if head != PDF_MAGIC:
+            raise HTTPException(status_code=400, detail="Only PDF files are accepted.")
+
+        doc_hash = digest.hexdigest()
+        file_path = os.path.join(DOCUMENTS_FOLDER, f"{doc_hash}.pdf")
+        await asyncio.to_thread(os.replace, tmp_path, file_path)
+        return upload.fields, upload.filename, file_path, doc_hash
+    finally:
+        out.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# The body is parsed by hand, so describe the form for the API docs
+UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file", "meeting_id"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "meeting_id": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+@router.post("/upload/", response_model=Dict[str, str], openapi_extra=UPLOAD_FORM_SCHEMA)
+async def document(request: Request, current_user: User = Depends(get_current_user)):
+    # Save the file to the local storage as it arrives; the meeting id may come before or after it
+    fields, filename, file_path, doc_hash = await receive_upload(request)
+    meeting_id = fields.get("meeting_id")
+    if not meeting_id:
+        raise HTTPException(status_code=400, detail="meeting_id is required.")
 
     # Fetch the meeting by meeting_id and update its status
     meeting = await Meeting.get(meeting_id)
@@ -37,15 +189,23 @@ async def document(
         meeting.add_participant(current_user)
     await meeting.save()
 
-    # Define the path to save the file
-    file_name = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{file.filename}"
-    file_path = os.path.join(DOCUMENTS_FOLDER, file_name)
-
-    # Save the file to the local storage
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    # Hand the processing over to the ingestion worker processes
+    try:
+        job_id = await asyncio.to_thread(ingestion_executor.submit, file_path, meeting_id, doc_hash)
+    except IngestionQueueFull:
+        raise HTTPException(status_code=503, detail="Too many documents are being processed. Please retry later.")
 
-    # Schedule the processing task in the background
-    background_tasks.add_task(process_and_index_pdf, file_path, meeting_id)
+    return {
+        "job_id": job_id,
+        "message": f"File {filename} saved successfully as {file_path}. Processing will continue in the background."
+    }
 
-    return f"File {file.filename} saved successfully as {file_path}. Processing will continue in the background."
+@router.get("/upload/{job_id}", response_model=Dict[str, Any])
+async def document_status(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Report whether an uploaded document is queued, running, done or failed.
+    """
+    job = await asyncio.to_thread(ingestion_executor.status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
@@ -3,7 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from models.meeting import Meeting, MeetingStatus
 from models.user import User
 from misc.utility import get_current_user, get_participants
+from services.session import sessions
+from services.vad import VadStats
+from services.audio_encoding import EncodingStats
 from typing import Dict, Any
+from core.config import settings
 
 router = APIRouter()
 
@@ -96,4 +100,20 @@ async def get_meeting(meeting_id: str, current_user: User = Depends(get_current_
             detail=f"Failed to retrieve meeting: {str(e)}"
         )
 
+@router.get("/meeting/{meeting_id}/vad", response_model=Dict[str, Any])
+async def get_vad_stats(meeting_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Report how much of a live meeting's audio voice-activity detection skipped or trimmed on this worker.
+    """
+    session = sessions.get(meeting_id)
+    stats = session.vad if session is not None else VadStats()
+    return {"meetingId": meeting_id, **stats.as_dict()}
 
+@router.get("/meeting/{meeting_id}/encoding", response_model=Dict[str, Any])
+async def get_encoding_stats(meeting_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Report how many bytes a live meeting's utterances took to upload for transcription on this worker, and the time spent encoding them.
+    """
+    session = sessions.get(meeting_id)
+    stats = session.encoding if session is not None else EncodingStats()
+    return {"meetingId": meeting_id, "format": settings.AUDIO_UPLOAD_FORMAT, **stats.as_dict()}
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+# Seconds a leaving subscriber gets to flush already queued messages
+FLUSH_TIMEOUT = 5
+
+# Keep references to in-flight disconnects of slow clients so they are not garbage collected
+disconnect_tasks = set()
+
+
+class SlowClientPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    DISCONNECT = "disconnect"
+
+
+class Subscriber:
+    """A meeting participant with its own outbound queue and writer task."""
+
+    def __init__(self, websocket, username: str, queue_size: int, policy: SlowClientPolicy):
+        self.websocket = websocket
+        self.username = username
+        self.policy = policy
+        self.dropped = 0
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self.writer = asyncio.create_task(self._write())
+
+    def offer(self, text: str):
+        """Queue an already serialized message without waiting on the client."""
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(text)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        self.dropped += 1
+        if self.policy == SlowClientPolicy.DROP_OLDEST:
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.queue.put_nowait(text)
+        elif self.policy == SlowClientPolicy.DISCONNECT:
+            logger.info(f"Disconnecting slow client {self.username} after {self.dropped} dropped messages")
+            self.closed = True
+            self.writer.cancel()
+            task = asyncio.create_task(self._disconnect())
+            disconnect_tasks.add(task)
+            task.add_done_callback(disconnect_tasks.discard)
+
+    async def close(self):
+        """Flush queued messages, then stop the writer."""
+        if self.dropped and self.policy != SlowClientPolicy.DISCONNECT:
+            logger.info(f"Dropped {self.dropped} messages for slow client {self.username}")
+        if not self.closed and not self.writer.done():
+            self.closed = True
+            try:
+                await asyncio.wait_for(self.queue.join(), FLUSH_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+        self.writer.cancel()
+
+    async def _write(self):
+        while True:
+            text = await self.queue.get()
+            try:
+                await self.websocket.send_text(text)
+            except Exception as e:
+                logger.info(f"Failed to send to {self.username}: {e}")
+                self.closed = True
+                return
+            finally:
+                self.queue.task_done()
+
+    async def _disconnect(self):
+        try:
+            # 1013: try again later
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+
+
+class MeetingHub:
+    """Fans meeting messages out to every subscriber without one slow client blocking the rest.
+
+    Messages are published through a BroadcastBackend, so subscribers connected to other
+    workers receive them too; this hub only delivers to the subscribers of its own process.
+    """
+
+    def __init__(self, backend, queue_size: int, policy: SlowClientPolicy):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.policy = policy
+        self._meetings = {}
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    async def subscribe(self, meeting_id: str, websocket, username: str) -> Subscriber:
+        subscriber = Subscriber(websocket, username, self.queue_size, self.policy)
+        if meeting_id not in self._meetings:
+            self._meetings[meeting_id] = []
+            await self.backend.subscribe(meeting_id)
+        self._meetings[meeting_id].append(subscriber)
+        return subscriber
+
+    async def unsubscribe(self, meeting_id: str, subscriber: Subscriber):
+        subscribers = self._meetings.get(meeting_id, [])
+        if subscriber in subscribers:
+            subscribers.remove(subscriber)
+        if not subscribers and self._meetings.pop(meeting_id, None) is not None:  # Remove empty meeting
+            await self.backend.unsubscribe(meeting_id)
+        await subscriber.close()
+
+    def subscribers(self, meeting_id: str):
+        """Subscribers of the meeting connected to this worker."""
+        return list(self._meetings.get(meeting_id, []))
+
+    async def broadcast(self, meeting_id: str, message: dict):
+        """Serialize the message once and publish it to every subscriber of the meeting."""
+        await self.backend.publish(meeting_id, json.dumps(message))
+
+    async def send(self, subscriber: Subscriber, message: dict):
+        """Queue a message for a single subscriber.
+
+        Ordered with the subscriber's broadcasts only on the in-process backend; with Redis,
+        broadcasts take a round trip and may arrive after a later send.
+        """
+        subscriber.offer(json.dumps(message))
+
+    def _deliver(self, meeting_id: str, text: str):
+        for subscriber in self._meetings.get(meeting_id, []):
+            subscriber.offer(text)
@@ -1,2 +1,10 @@
-# Dictionary to store WebSocket connections per meeting ID
-meetings = {}  # Example structure: {meeting_id: [{"websocket": ws, "username": user_name}]}
\ No newline at end of file
+from core.broadcast import MeetingHub, SlowClientPolicy
+from core.config import settings
+from core.pubsub import create_backend
+
+# Broadcast hub holding the WebSocket subscribers of every meeting ID
+meetings = MeetingHub(
+    create_backend(settings.BROADCAST_BACKEND, settings.BROADCAST_REDIS_URL),
+    settings.BROADCAST_QUEUE_SIZE,
+    SlowClientPolicy(settings.BROADCAST_SLOW_CLIENT_POLICY)
+)
@@ -16,4 +16,92 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
+    # Upper bound on memory held by cached per-meeting FAISS indices and chunks
+    FAISS_MEMORY_BUDGET_MB: int = int(os.getenv("FAISS_MEMORY_BUDGET_MB", 512))
+    # Most per-meeting FAISS indices kept open at once; memory-mapped ones barely count towards the budget
+    FAISS_MAX_CACHED_INDICES: int = int(os.getenv("FAISS_MAX_CACHED_INDICES", 256))
+    # Number of chunks embedded per forward pass during PDF ingestion
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+    # Worker processes used for PDF ingestion and how many jobs may wait for them
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", 1))
+    INGEST_MAX_PENDING_JOBS: int = int(os.getenv("INGEST_MAX_PENDING_JOBS", 16))
+    # Shared async OpenAI client: connection pool size, per-call timeouts (seconds) and concurrency caps
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+    OPENAI_TRANSCRIPTION_TIMEOUT: float = float(os.getenv("OPENAI_TRANSCRIPTION_TIMEOUT", 30))
+    OPENAI_COMPLETION_TIMEOUT: float = float(os.getenv("OPENAI_COMPLETION_TIMEOUT", 90))
+    OPENAI_MAX_CONCURRENT_TRANSCRIPTIONS: int = int(os.getenv("OPENAI_MAX_CONCURRENT_TRANSCRIPTIONS", 32))
+    OPENAI_MAX_CONCURRENT_COMPLETIONS: int = int(os.getenv("OPENAI_MAX_CONCURRENT_COMPLETIONS", 8))
+    # Opt-in archiving of received audio to the recordings folder
+    ARCHIVE_RECORDINGS: bool = os.getenv("ARCHIVE_RECORDINGS", "false").lower() == "true"
+    # Outbound messages queued per meeting participant, and what to do once a slow client fills its queue
+    # (drop_oldest, drop_newest or disconnect)
+    BROADCAST_QUEUE_SIZE: int = int(os.getenv("BROADCAST_QUEUE_SIZE", 64))
+    BROADCAST_SLOW_CLIENT_POLICY: str = os.getenv("BROADCAST_SLOW_CLIENT_POLICY", "drop_oldest")
+    # "memory" for a single worker, "redis" to fan broadcasts out across workers and nodes. Sessions
+    # and analysis stay in one worker, so route all participants of a meeting to the same one
+    BROADCAST_BACKEND: str = os.getenv("BROADCAST_BACKEND", "memory")
+    BROADCAST_REDIS_URL: str = os.getenv("BROADCAST_REDIS_URL", "redis://localhost:6379/0")
+    # Transcript segments kept in memory per meeting before older ones are spilled to disk
+    SESSION_MAX_SEGMENTS: int = int(os.getenv("SESSION_MAX_SEGMENTS", 500))
+    # "incremental" sends only new speech plus a rolling summary to GPT-4o; "full" re-sends the whole transcript
+    ANALYSIS_MODE: str = os.getenv("ANALYSIS_MODE", "incremental")
+    # Periodic analysis runs after this many seconds or this many new transcript tokens, whichever is first
+    ANALYSIS_INTERVAL_SECONDS: float = float(os.getenv("ANALYSIS_INTERVAL_SECONDS", 60))
+    ANALYSIS_TOKEN_THRESHOLD: int = int(os.getenv("ANALYSIS_TOKEN_THRESHOLD", 400))
+    # Summaries cached by transcript and context hash
+    SUMMARY_CACHE_SIZE: int = int(os.getenv("SUMMARY_CACHE_SIZE", 128))
+    SUMMARY_CACHE_TTL_SECONDS: float = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 600))
+    # Forward analysis and summary items to clients while GPT-4o is still generating
+    STREAM_RESULTS: bool = os.getenv("STREAM_RESULTS", "true").lower() == "true"
+    # Retrieval queries FAISS with the most recent transcript windows of this many words
+    RETRIEVAL_WINDOW_WORDS: int = int(os.getenv("RETRIEVAL_WINDOW_WORDS", 150))
+    RETRIEVAL_WINDOW_COUNT: int = int(os.getenv("RETRIEVAL_WINDOW_COUNT", 4))
+    # Document context sent to GPT-4o: candidates considered, MMR relevance/diversity balance and token budget
+    CONTEXT_CANDIDATES: int = int(os.getenv("CONTEXT_CANDIDATES", 20))
+    CONTEXT_MMR_LAMBDA: float = float(os.getenv("CONTEXT_MMR_LAMBDA", 0.7))
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1200))
+    # FAISS index type per meeting: auto, flat, hnsw, ivfpq or sq8. "auto" moves from flat to HNSW
+    # and then IVF-PQ as the vector count passes the thresholds below
+    FAISS_INDEX_TYPE: str = os.getenv("FAISS_INDEX_TYPE", "auto")
+    FAISS_HNSW_MIN_VECTORS: int = int(os.getenv("FAISS_HNSW_MIN_VECTORS", 10000))
+    FAISS_IVF_MIN_VECTORS: int = int(os.getenv("FAISS_IVF_MIN_VECTORS", 100000))
+    FAISS_NPROBE: int = int(os.getenv("FAISS_NPROBE", 16))
+    FAISS_EF_SEARCH: int = int(os.getenv("FAISS_EF_SEARCH", 64))
+    # Memory-map indices opened for retrieval instead of reading them into RAM (IVF indices always;
+    # flat and HNSW ones only with a faiss that has IO_FLAG_MMAP_IFC, otherwise they are read into RAM)
+    FAISS_MMAP: bool = os.getenv("FAISS_MMAP", "true").lower() == "true"
+    # Largest accepted document upload, and the size of the blocks it is streamed to disk in
+    MAX_UPLOAD_MB: int = int(os.getenv("MAX_UPLOAD_MB", 50))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+    # The embedding model loads on first use by default. EMBEDDING_WARMUP loads it (and runs one
+    # encode) at startup; EMBEDDING_PRELOAD loads it when main is imported, so a pre-forking server
+    # (gunicorn --preload) shares one copy of the weights between its workers
+    EMBEDDING_WARMUP: bool = os.getenv("EMBEDDING_WARMUP", "false").lower() == "true"
+    EMBEDDING_PRELOAD: bool = os.getenv("EMBEDDING_PRELOAD", "false").lower() == "true"
+    # Embedding runtime: "torch", "onnx" or "onnx-int8" (ONNX Runtime, needs optimum[onnxruntime]),
+    # and the intra-op threads it may use per process (0 keeps the library default)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_THREADS: int = int(os.getenv("EMBEDDING_THREADS", 0))
+    # Voice-activity detection drops PCM chunks with less than VAD_MIN_SPEECH_MS of frames louder than
+    # VAD_THRESHOLD_DB (dBFS) before Whisper, and trims silence around speech down to VAD_PADDING_MS
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "true").lower() == "true"
+    VAD_THRESHOLD_DB: float = float(os.getenv("VAD_THRESHOLD_DB", -45))
+    VAD_MIN_SPEECH_MS: int = int(os.getenv("VAD_MIN_SPEECH_MS", 200))
+    VAD_PADDING_MS: int = int(os.getenv("VAD_PADDING_MS", 150))
+    # Each connection merges audio into utterances of up to UTTERANCE_TARGET_SECONDS (cut early at pauses,
+    # or after UTTERANCE_IDLE_FLUSH_SECONDS without audio) and transcribes up to TRANSCRIPTION_WORKERS
+    # of them at once, with at most TRANSCRIPTION_MAX_PENDING waiting before receiving is slowed down
+    UTTERANCE_TARGET_SECONDS: float = float(os.getenv("UTTERANCE_TARGET_SECONDS", 5))
+    UTTERANCE_IDLE_FLUSH_SECONDS: float = float(os.getenv("UTTERANCE_IDLE_FLUSH_SECONDS", 1.5))
+    TRANSCRIPTION_WORKERS: int = int(os.getenv("TRANSCRIPTION_WORKERS", 3))
+    TRANSCRIPTION_MAX_PENDING: int = int(os.getenv("TRANSCRIPTION_MAX_PENDING", 8))
+    # Utterances are uploaded to Whisper as "wav" (uncompressed), "flac" (lossless) or "opus" (WebM,
+    # at AUDIO_OPUS_BITRATE); compression costs encode CPU but cuts upload size several times
+    AUDIO_UPLOAD_FORMAT: str = os.getenv("AUDIO_UPLOAD_FORMAT", "flac")
+    AUDIO_OPUS_BITRATE: str = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+    # Transcript segments are written to MongoDB in batches of TRANSCRIPT_BATCH_SIZE or every
+    # TRANSCRIPT_FLUSH_SECONDS; up to TRANSCRIPT_MAX_BUFFERED per meeting are held while MongoDB is unreachable
+    TRANSCRIPT_BATCH_SIZE: int = int(os.getenv("TRANSCRIPT_BATCH_SIZE", 50))
+    TRANSCRIPT_FLUSH_SECONDS: float = float(os.getenv("TRANSCRIPT_FLUSH_SECONDS", 5))
+    TRANSCRIPT_MAX_BUFFERED: int = int(os.getenv("TRANSCRIPT_MAX_BUFFERED", 10000))
 settings = Settings()
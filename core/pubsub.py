@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastBackend:
+    """Carries serialized meeting messages to every worker that has subscribers for the meeting."""
+
+    async def start(self, deliver):
+        """Begin delivering published messages by calling deliver(meeting_id, text)."""
+        self.deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def subscribe(self, meeting_id: str):
+        pass
+
+    async def unsubscribe(self, meeting_id: str):
+        pass
+
+    async def publish(self, meeting_id: str, text: str):
+        raise NotImplementedError
+
+
+class InProcessBackend(BroadcastBackend):
+    """Single-worker backend: messages never leave this process."""
+
+    async def publish(self, meeting_id: str, text: str):
+        self.deliver(meeting_id, text)
+
+
+class RedisBackend(BroadcastBackend):
+    """Multi-worker backend using Redis pub/sub, or any Redis-compatible server (including over a Unix socket)."""
+
+    CHANNEL_PREFIX = "meeting:"
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("The redis broadcast backend requires the 'redis' package: pip install redis")
+        self.redis = redis.from_url(url)
+        self.pubsub = self.redis.pubsub()
+        self.listener = None
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        self.listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+
+    async def subscribe(self, meeting_id: str):
+        await self.pubsub.subscribe(self.CHANNEL_PREFIX + meeting_id)
+
+    async def unsubscribe(self, meeting_id: str):
+        await self.pubsub.unsubscribe(self.CHANNEL_PREFIX + meeting_id)
+
+    async def publish(self, meeting_id: str, text: str):
+        await self.redis.publish(self.CHANNEL_PREFIX + meeting_id, text)
+
+    async def _listen(self):
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                channel = message["channel"].decode()
+                self.deliver(channel[len(self.CHANNEL_PREFIX):], message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Broadcast backend error: {e}")
+                await asyncio.sleep(1)
+
+
+def create_backend(name: str, url: str = None) -> BroadcastBackend:
+    if name == "memory":
+        return InProcessBackend()
+    if name == "redis":
+        return RedisBackend(url)
+    raise ValueError(f"Unknown broadcast backend: {name}")
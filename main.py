@@ -1,20 +1,42 @@
+import asyncio
+import gc
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import uvicorn
 
 from core.config import settings
 from core.database import init_db
+from core.common import meetings
+from services.ingestion import ingestion_executor
+from services.transcript_writer import transcript_writer
+from services.embedding import warm_up_model
+from services import openai_client
 
 from api.v1 import audio, meeting, user, file
 
 from models.transcript import Transcript
 
+if settings.EMBEDDING_PRELOAD:
+    # Load the weights before a pre-forking server forks its workers, then keep the
+    # garbage collector from touching (and so copying) the shared pages
+    warm_up_model(run_inference=False)
+    gc.freeze()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await meetings.start()
+    transcript_writer.start()
+    if settings.EMBEDDING_WARMUP:
+        await asyncio.to_thread(warm_up_model)
     yield
     # Code below runs when the application shuts down
+    ingestion_executor.shutdown()
+    await transcript_writer.stop()
+    await meetings.stop()
+    await openai_client.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME, 
@@ -29,6 +51,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse uploads whose declared size is over the limit before the body is read
+    if request.method == "POST" and request.url.path.startswith("/api/upload"):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > file.MAX_UPLOAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File exceeds the {settings.MAX_UPLOAD_MB} MB upload limit."}
+            )
+    return await call_next(request)
+
 # Include audio routes under v1 API version
 app.include_router(audio.router, prefix="/ws")
 app.include_router(meeting.router, prefix="/api")
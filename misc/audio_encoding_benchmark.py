@@ -0,0 +1,43 @@
+"""
+Compare upload size and encode time of each audio upload format on a recording.
+
+The recording is converted to 16 kHz mono 16-bit PCM (what clients stream) and cut into
+utterances, which are encoded one by one like the transcription pipeline does.
+
+Usage:
+    python -m misc.audio_encoding_benchmark recording.wav
+    python -m misc.audio_encoding_benchmark recording.wav --seconds 3 --bitrate 16k
+"""
+import argparse
+from pydub import AudioSegment
+from services.audio_encoding import AUDIO_FORMATS, encode_for_upload
+from services.vad import SAMPLE_RATE, SAMPLE_WIDTH
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--seconds", type=float, default=5, help="utterance length")
+    parser.add_argument("--bitrate", default="24k", help="Opus bitrate")
+    args = parser.parse_args()
+
+    audio = AudioSegment.from_file(args.recording).set_frame_rate(SAMPLE_RATE).set_channels(1).set_sample_width(SAMPLE_WIDTH)
+    pcm = audio.raw_data
+    step = int(args.seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+    utterances = [pcm[i:i + step] for i in range(0, len(pcm), step)]
+
+    print(f"{len(utterances)} utterances of {args.seconds}s, {len(pcm) / 2**20:.1f} MB of PCM")
+    print(f"{'format':<8}{'KB/utt':>10}{'ratio':>8}{'ms/utt':>10}")
+    for audio_format in AUDIO_FORMATS:
+        total_bytes = 0
+        total_seconds = 0.0
+        for utterance in utterances:
+            audio_bytes, _, seconds = encode_for_upload(utterance, audio_format, args.bitrate)
+            total_bytes += len(audio_bytes)
+            total_seconds += seconds
+        print(f"{audio_format:<8}{total_bytes / len(utterances) / 1024:>10.1f}{len(pcm) / total_bytes:>8.1f}"
+              f"{total_seconds / len(utterances) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
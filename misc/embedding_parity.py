@@ -0,0 +1,69 @@
+"""
+Check an embedding backend against the PyTorch reference and compare their latency.
+
+Reports the minimum and mean cosine similarity between the two backends' embeddings of the
+same texts, plus per-batch and single-text (retrieval path) latency of each.
+
+Usage:
+    python -m misc.embedding_parity --backend onnx-int8
+    python -m misc.embedding_parity --backend onnx --pdf documents/<hash>.pdf --threads 4
+"""
+import argparse
+import time
+from services.embedding import BACKENDS, check_parity, create_backend
+
+SAMPLE_TEXTS = [
+    "Let's review the action items from last week's planning meeting.",
+    "The quarterly revenue target was missed by about four percent.",
+    "Can someone share the design document for the new onboarding flow?",
+    "We agreed to move the release date to the end of the month.",
+    "The customer reported intermittent timeouts on the upload endpoint.",
+    "Marketing wants a draft of the announcement by Friday.",
+    "Budget approval for the additional servers is still pending.",
+    "Next steps: finalize the contract and schedule a follow-up call.",
+]
+
+
+def load_texts(args):
+    if args.pdf:
+        from services.fais import iter_pdf_chunks
+        return [text for text, _ in iter_pdf_chunks(args.pdf)][:args.limit]
+    return (SAMPLE_TEXTS * (args.limit // len(SAMPLE_TEXTS) + 1))[:args.limit]
+
+
+def latency(backend, texts, batch_size, repeats=3):
+    backend.encode(texts[:1])
+    start = time.perf_counter()
+    for _ in range(repeats):
+        backend.encode(texts, batch_size)
+    batch = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for text in texts[:50]:
+        backend.encode([text], 1)
+    single = (time.perf_counter() - start) / min(len(texts), 50)
+    return batch, single
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=list(BACKENDS), default="onnx-int8")
+    parser.add_argument("--pdf")
+    parser.add_argument("--limit", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = load_texts(args)
+    reference = create_backend("torch", args.threads)
+    candidate = create_backend(args.backend, args.threads)
+
+    parity = check_parity(reference, candidate, texts, args.batch_size)
+    print(f"{len(texts)} texts, cosine similarity to torch: min {parity['min']:.4f}, mean {parity['mean']:.4f}")
+    print(f"{'backend':<12}{'batch s':>10}{'ms/text':>10}")
+    for backend in (reference, candidate):
+        batch, single = latency(backend, texts, args.batch_size)
+        print(f"{backend.name:<12}{batch:>10.3f}{single * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
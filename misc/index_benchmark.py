@@ -0,0 +1,64 @@
+"""
+Compare recall and latency of the FAISS index types against exact (flat) search.
+
+Usage:
+    python -m misc.index_benchmark --meeting-id <id>      # vectors of an indexed meeting
+    python -m misc.index_benchmark --vectors 200000       # random vectors
+"""
+import argparse
+import time
+import numpy as np
+import faiss
+from services.index_factory import INDEX_KINDS, IVF_KINDS, FLAT, MIN_TRAINING_VECTORS, build_index, index_nbytes
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+
+
+def load_vectors(args):
+    if args.meeting_id:
+        index = faiss.read_index(f"indices/{args.meeting_id}.faiss")
+        return index.reconstruct_n(0, index.ntotal)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.vectors, DIMENSION)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meeting-id")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    rng = np.random.default_rng(1)
+    # Perturbed corpus vectors stand in for transcript windows close to document text
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + rng.normal(0, 0.05, queries.shape).astype('float32')
+
+    baseline = build_index(vectors, FLAT)
+    _, truth = baseline.search(queries, args.k)
+
+    print(f"{len(vectors)} vectors, {args.queries} queries, k={args.k}")
+    print(f"{'index':<8}{'build s':>10}{'MB':>10}{'ms/query':>12}{'recall':>10}")
+    for kind in INDEX_KINDS:
+        if kind in IVF_KINDS and len(vectors) < MIN_TRAINING_VECTORS:
+            print(f"{kind:<8}skipped: IVF training needs at least {MIN_TRAINING_VECTORS} vectors")
+            continue
+        start = time.perf_counter()
+        index = build_index(vectors, kind)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query[None, :], args.k)
+        latency = (time.perf_counter() - start) / len(queries) * 1000
+
+        _, found = index.search(queries, args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        print(f"{kind:<8}{build_time:>10.2f}{index_nbytes(index) / 2**20:>10.1f}{latency:>12.3f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure worker startup cost for each embedding model loading mode.
+
+Every mode runs in a fresh interpreter and reports how long `import main` takes, how long
+the application lifespan takes to start (together, what a worker pays before it can answer
+`/`), how long the first embedding takes, and the resident memory afterwards. The lifespan
+connects to MongoDB, so MONGODB_URL must point at a reachable server.
+
+Usage:
+    python -m misc.startup_benchmark
+"""
+import json
+import os
+import subprocess
+import sys
+
+MODES = {
+    "lazy": {},
+    "warmup": {"EMBEDDING_WARMUP": "true"},
+    "preload": {"EMBEDDING_PRELOAD": "true"},
+}
+
+PROBE = """
+import asyncio, json, resource, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+
+async def start_app():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+start = time.perf_counter()
+asyncio.run(start_app())
+started = time.perf_counter() - start
+from services.embedding import get_backend
+start = time.perf_counter()
+get_backend().encode(["first request"])
+first_embedding = time.perf_counter() - start
+print(json.dumps({
+    "import": imported,
+    "lifespan": started,
+    "first_embedding": first_embedding,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def run(extra_env):
+    env = dict(os.environ, **extra_env)
+    result = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'mode':<10}{'import s':>10}{'lifespan s':>12}{'first embed s':>15}{'max RSS MB':>12}")
+    for mode, env in MODES.items():
+        timings = run(env)
+        print(f"{mode:<10}{timings['import']:>10.2f}{timings['lifespan']:>12.2f}"
+              f"{timings['first_embedding']:>15.2f}{timings['rss_mb']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 # models.py
-from beanie import Document
+from beanie import Document, Indexed
 from datetime import datetime
+from typing import Optional
 from pydantic import Field
 
 class Transcript(Document):
-    meeting_id: str
+    meeting_id: Indexed(str)
+    speaker: Optional[str] = None
     text: str
     timestamp: datetime = Field(default_factory=datetime.now)
 
@@ -15,6 +17,7 @@ class Transcript(Document):
         json_schema_extra = {
             "example": {
                 "meeting_id": "12345",
+                "speaker": "Jane Doe",
                 "text": "This is the meeting transcript...",
                 "timestamp": "2024-10-18T10:00:00Z",
             }
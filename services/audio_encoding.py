@@ -0,0 +1,84 @@
+import io
+import time
+import wave
+import logging
+from pydub import AudioSegment
+from services.vad import SAMPLE_RATE, SAMPLE_WIDTH
+
+logger = logging.getLogger(__name__)
+
+WAV = "wav"
+FLAC = "flac"
+OPUS = "opus"
+AUDIO_FORMATS = (WAV, FLAC, OPUS)
+
+# pydub/ffmpeg export arguments and the file extension the transcription API sees
+EXPORT_OPTIONS = {
+    FLAC: ({"format": "flac"}, "flac"),
+    OPUS: ({"format": "webm", "codec": "libopus"}, "webm"),
+}
+
+
+def encode_wav(pcm_bytes):
+    """Wrap raw PCM bytes in a WAV container in memory"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)  # mono
+        wav_file.setsampwidth(SAMPLE_WIDTH)  # 16-bit
+        wav_file.setframerate(SAMPLE_RATE)  # 16kHz
+        wav_file.writeframes(pcm_bytes)
+    return buffer.getvalue()
+
+
+def encode_pcm(pcm_bytes: bytes, audio_format: str, bitrate: str = None):
+    """Encode 16 kHz mono 16-bit PCM for upload, returning (audio_bytes, extension)."""
+    if audio_format == WAV:
+        return encode_wav(pcm_bytes), "wav"
+    if audio_format not in EXPORT_OPTIONS:
+        raise ValueError(f"Unknown audio upload format: {audio_format}")
+    options, extension = EXPORT_OPTIONS[audio_format]
+    segment = AudioSegment(data=pcm_bytes, sample_width=SAMPLE_WIDTH, frame_rate=SAMPLE_RATE, channels=1)
+    buffer = io.BytesIO()
+    segment.export(buffer, bitrate=bitrate if audio_format == OPUS else None, **options)
+    return buffer.getvalue(), extension
+
+
+class EncodingStats:
+    """Per-meeting counters of audio uploaded for transcription and the time spent compressing it."""
+
+    def __init__(self):
+        self.utterances = 0
+        self.pcm_bytes = 0
+        self.upload_bytes = 0
+        self.encode_seconds = 0.0
+
+    def record(self, pcm_bytes: int, upload_bytes: int, encode_seconds: float):
+        self.utterances += 1
+        self.pcm_bytes += pcm_bytes
+        self.upload_bytes += upload_bytes
+        self.encode_seconds += encode_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "utterances": self.utterances,
+            "pcm_bytes": self.pcm_bytes,
+            "upload_bytes": self.upload_bytes,
+            "compression_ratio": round(self.pcm_bytes / self.upload_bytes, 2) if self.upload_bytes else None,
+            "encode_seconds": round(self.encode_seconds, 3),
+        }
+
+
+def encode_for_upload(pcm_bytes: bytes, audio_format: str, bitrate: str = None):
+    """Encode an utterance in the given format, falling back to WAV if the encoder (ffmpeg) fails.
+
+    Returns (audio_bytes, extension, encode_seconds).
+    """
+    start = time.perf_counter()
+    try:
+        audio_bytes, extension = encode_pcm(pcm_bytes, audio_format, bitrate)
+    except Exception as e:
+        logger.error(f"Encoding audio as {audio_format} failed, uploading WAV instead: {e}")
+        audio_bytes, extension = encode_wav(pcm_bytes), "wav"
+    elapsed = time.perf_counter() - start
+    logger.debug(f"Encoded {len(pcm_bytes)} bytes of PCM as {len(audio_bytes)} bytes of {extension} in {elapsed * 1000:.1f}ms")
+    return audio_bytes, extension, elapsed
@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+
+def content_hash(*parts: str) -> str:
+    """Stable hash of the given text parts, used as a cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one in-flight coroutine."""
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key, factory):
+        """Await factory() for the first caller of key; later callers share its result."""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        # Shield so one caller going away does not cancel the call for everyone else
+        return await asyncio.shield(task)
@@ -0,0 +1,116 @@
+import os
+import json
+import mmap
+import shutil
+import numpy as np
+
+# Files making up a chunk store, next to the meeting's .faiss index
+TEXT_SUFFIX = ".chunks"
+META_SUFFIX = ".meta"
+OFFSETS_SUFFIX = ".offsets.npy"
+SUFFIXES = (TEXT_SUFFIX, META_SUFFIX, OFFSETS_SUFFIX)
+
+
+def _map(path: str):
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ChunkStore:
+    """Chunk texts and metadata read straight from memory-mapped files.
+
+    Row i holds the text and metadata of FAISS vector id i. Texts and JSON metadata are
+    stored back to back in two files; an (n + 1, 2) int64 array holds their start offsets.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.offsets = np.load(prefix + OFFSETS_SUFFIX, mmap_mode="r")
+        self.texts = _map(prefix + TEXT_SUFFIX)
+        self.metas = _map(prefix + META_SUFFIX)
+
+    @staticmethod
+    def exists(prefix: str) -> bool:
+        return all(os.path.exists(prefix + suffix) for suffix in SUFFIXES)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i][0]), int(self.offsets[i + 1][0])
+        return self.texts[start:end].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def metadata(self, i: int) -> dict:
+        start, end = int(self.offsets[i][1]), int(self.offsets[i + 1][1])
+        return json.loads(self.metas[start:end])
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size: only the offsets are counted, text pages belong to the OS page cache."""
+        return self.offsets.nbytes
+
+
+class ChunkStoreWriter:
+    """Builds a new version of a chunk store in temporary files, then swaps it in.
+
+    When appending, existing rows are copied first so new chunks keep lining up with the
+    vector ids appended to the index.
+    """
+
+    def __init__(self, prefix: str, append: bool = True):
+        self.prefix = prefix
+        self.tmp_prefix = f"{prefix}.{os.getpid()}.tmp"
+        self.offsets = [[0, 0]]
+        self.text_file = open(self.tmp_prefix + TEXT_SUFFIX, "wb")
+        self.meta_file = open(self.tmp_prefix + META_SUFFIX, "wb")
+
+        if append and ChunkStore.exists(prefix):
+            existing = np.load(prefix + OFFSETS_SUFFIX)
+            self.offsets = existing.tolist()
+            for suffix, f in ((TEXT_SUFFIX, self.text_file), (META_SUFFIX, self.meta_file)):
+                with open(prefix + suffix, "rb") as source:
+                    shutil.copyfileobj(source, f)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def add(self, text: str, metadata: dict = None):
+        text_bytes = text.encode("utf-8")
+        meta_bytes = json.dumps(metadata or {}).encode("utf-8")
+        self.text_file.write(text_bytes)
+        self.meta_file.write(meta_bytes)
+        text_offset, meta_offset = self.offsets[-1]
+        self.offsets.append([text_offset + len(text_bytes), meta_offset + len(meta_bytes)])
+
+    def commit(self):
+        """Flush the new files to disk and atomically replace the old ones."""
+        for f in (self.text_file, self.meta_file):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        with open(self.tmp_prefix + OFFSETS_SUFFIX, "wb") as f:
+            np.save(f, np.array(self.offsets, dtype="int64"))
+            f.flush()
+            os.fsync(f.fileno())
+        # Offsets go last, so a reader never sees offsets pointing past the end of the text
+        for suffix in (TEXT_SUFFIX, META_SUFFIX, OFFSETS_SUFFIX):
+            os.replace(self.tmp_prefix + suffix, self.prefix + suffix)
+
+    def abort(self):
+        for f in (self.text_file, self.meta_file):
+            f.close()
+        for suffix in SUFFIXES:
+            if os.path.exists(self.tmp_prefix + suffix):
+                os.remove(self.tmp_prefix + suffix)
+
+
+def delete_chunk_store(prefix: str):
+    for suffix in SUFFIXES:
+        if os.path.exists(prefix + suffix):
+            os.remove(prefix + suffix)
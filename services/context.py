@@ -0,0 +1,77 @@
+import numpy as np
+from core.config import settings
+from services.fais import search_faiss_index
+from services.scheduler import estimate_tokens
+
+# Overlaps shorter than this are treated as coincidence rather than shared chunk text
+MIN_OVERLAP = 20
+# Chunks are split with a 100 character overlap; allow some slack for whitespace
+MAX_OVERLAP = 200
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mmr_select(queries, candidates, lambda_mult: float):
+    """Order candidate rows by maximal marginal relevance to the queries.
+
+    Each step picks the candidate that is most similar to any query while being least
+    similar to the candidates already picked.
+    """
+    queries = _normalize(queries)
+    candidates = _normalize(candidates)
+    relevance = (candidates @ queries.T).max(axis=1)
+    similarity = candidates @ candidates.T
+
+    order = []
+    redundancy = np.full(len(candidates), -np.inf)
+    remaining = np.ones(len(candidates), dtype=bool)
+    for _ in range(len(candidates)):
+        penalty = np.where(np.isinf(redundancy), 0.0, redundancy)
+        scores = np.where(remaining, lambda_mult * relevance - (1 - lambda_mult) * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        order.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return order
+
+
+def trim_overlap(text: str, selected):
+    """Remove leading or trailing text that repeats the edge of an already selected chunk."""
+    for other in selected:
+        for size in range(min(MAX_OVERLAP, len(text), len(other)), MIN_OVERLAP - 1, -1):
+            if other.endswith(text[:size]):
+                text = text[size:]
+                break
+        for size in range(min(MAX_OVERLAP, len(text), len(other)), MIN_OVERLAP - 1, -1):
+            if other.startswith(text[-size:]):
+                text = text[:-size]
+                break
+    return text.strip()
+
+
+def build_context(transcription, meeting_id,
+                  candidates: int = settings.CONTEXT_CANDIDATES,
+                  lambda_mult: float = settings.CONTEXT_MMR_LAMBDA,
+                  token_budget: int = settings.CONTEXT_TOKEN_BUDGET) -> str:
+    """Assemble de-duplicated document context for the transcript within a token budget."""
+    entry, queries, ranked = search_faiss_index(transcription, meeting_id, candidates)
+    if not ranked:
+        return ""
+
+    vectors = entry.index.reconstruct_batch(np.array(ranked, dtype='int64'))
+    selected = {}
+    used = 0
+    for position in mmr_select(queries, vectors, lambda_mult):
+        chunk_id = ranked[position]
+        text = trim_overlap(entry.chunks[chunk_id], selected.values())
+        cost = estimate_tokens(text)
+        if not text or used + cost > token_budget:
+            continue
+        selected[chunk_id] = text
+        used += cost
+
+    # Present chunks in document order so neighbouring chunks read continuously
+    return "\n".join(selected[chunk_id] for chunk_id in sorted(selected))
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+import numpy as np
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# ONNX exports shipped in the model repository
+ONNX_FILE = "onnx/model.onnx"
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+class EmbeddingBackend:
+    """Turns texts into float32 sentence embeddings on the CPU."""
+
+    name = None
+
+    def __init__(self, threads: int = 0):
+        self.threads = threads
+        self.model = self._load()
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size: int = 32):
+        """Return a (len(texts), dimension) float32 matrix."""
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype('float32', copy=False)
+
+    def _load(self):
+        raise NotImplementedError
+
+
+class TorchBackend(EmbeddingBackend):
+    """The reference PyTorch SentenceTransformer."""
+
+    name = "torch"
+
+    def _load(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        return SentenceTransformer(MODEL_NAME, device="cpu")
+
+
+class OnnxBackend(EmbeddingBackend):
+    """The same MiniLM model exported to ONNX, run by ONNX Runtime (requires optimum[onnxruntime])."""
+
+    name = "onnx"
+    file_name = ONNX_FILE
+
+    def _load(self):
+        import onnxruntime
+        from sentence_transformers import SentenceTransformer
+
+        session_options = onnxruntime.SessionOptions()
+        if self.threads:
+            session_options.intra_op_num_threads = self.threads
+            session_options.inter_op_num_threads = 1
+        return SentenceTransformer(
+            MODEL_NAME,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={
+                "file_name": self.file_name,
+                "provider": "CPUExecutionProvider",
+                "session_options": session_options
+            }
+        )
+
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """Dynamically int8-quantized ONNX export: smaller and faster, with a small accuracy cost."""
+
+    name = "onnx-int8"
+    file_name = ONNX_INT8_FILE
+
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, OnnxBackend, QuantizedOnnxBackend)}
+
+
+def create_backend(name: str, threads: int = 0) -> EmbeddingBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name}")
+    start = time.perf_counter()
+    backend = BACKENDS[name](threads)
+    logger.info(f"Loaded {name} embedding backend for {MODEL_NAME} in {time.perf_counter() - start:.2f}s")
+    return backend
+
+
+# Configured backend, loaded on first use so importing this module stays cheap
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> EmbeddingBackend:
+    """Return the configured embedding backend, loading it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(settings.EMBEDDING_BACKEND, settings.EMBEDDING_THREADS)
+    return _backend
+
+
+def warm_up_model(run_inference: bool = True):
+    """Load the embedding model ahead of the first request.
+
+    Preloading in a server's master process before it forks shares the weights copy-on-write
+    between workers; that must skip inference, since the runtimes' thread pools do not survive a fork.
+    """
+    backend = get_backend()
+    if run_inference:
+        start = time.perf_counter()
+        backend.encode(["warm-up"])
+        logger.info(f"Embedding model warm-up took {time.perf_counter() - start:.2f}s")
+
+
+def check_parity(reference: EmbeddingBackend, candidate: EmbeddingBackend, texts, batch_size: int = 32):
+    """Compare a backend against the reference on the same texts, by cosine similarity of each pair."""
+    expected = reference.encode(texts, batch_size)
+    actual = candidate.encode(texts, batch_size)
+    expected = expected / np.linalg.norm(expected, axis=1, keepdims=True)
+    actual = actual / np.linalg.norm(actual, axis=1, keepdims=True)
+    similarity = (expected * actual).sum(axis=1)
+    return {"min": float(similarity.min()), "mean": float(similarity.mean())}
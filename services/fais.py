@@ -1,79 +1,419 @@
 import os
-from langchain.document_loaders import PyMuPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import numpy as np
 import faiss
+from core.config import settings
+from services.cache import content_hash
+from services.embedding import get_backend
+from services.chunk_store import ChunkStore, ChunkStoreWriter, delete_chunk_store
+from services.index_factory import FLAT, build_index, choose_index_kind, configure_search, index_kind, index_nbytes, mmap_flags, should_rebuild
 
 INDEX_DIRECTORY = "indices"
 os.makedirs(INDEX_DIRECTORY, exist_ok=True)
 
-# Load SentenceTransformer model
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+# Content-addressed chunks and embeddings shared by every meeting a document is attached to
+EMBEDDING_DIRECTORY = "embeddings"
+os.makedirs(EMBEDDING_DIRECTORY, exist_ok=True)
+VECTORS_SUFFIX = ".vectors"
 
-# Use global variables for chunks and index
-chunks = []
-index = None  # Initialize index as a global variable
+logger = logging.getLogger(__name__)
 
-def process_and_index_pdf(file_path: str, meeting_id: str):
-    global chunks, index  # Indicate that we are using the global variables
-    
-    # Load and split the PDF document into chunks
-    loader = PyMuPDFLoader(file_path)
-    documents = loader.load()
+# Embeddings of recent transcript windows, so retrieval never re-encodes text it has seen
+WINDOW_CACHE_SIZE = 4096
+window_cache = OrderedDict()
+window_cache_lock = threading.Lock()
+
+
+class IndexEntry:
+    """FAISS index and chunk store belonging to a single meeting."""
+
+    def __init__(self, index, chunks: ChunkStore, mapped: bool = False):
+        self.index = index
+        self.chunks = chunks
+        self.mapped = mapped
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the vectors and chunk store."""
+        return index_nbytes(self.index, self.mapped) + self.chunks.nbytes
+
+
+class FaissIndexRegistry:
+    """Per-meeting FAISS indices, loaded lazily from disk and evicted in LRU order.
+
+    Entries are evicted once their resident size exceeds memory_budget or there are more
+    than max_entries of them; the count cap bounds memory-mapped entries, which count
+    next to nothing towards the budget.
+    """
+
+    def __init__(self, directory: str, memory_budget: int, max_entries: int):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._meeting_locks = {}
+
+    def index_path(self, meeting_id: str) -> str:
+        return os.path.join(self.directory, f"{meeting_id}.faiss")
+
+    def chunks_prefix(self, meeting_id: str) -> str:
+        return os.path.join(self.directory, meeting_id)
+
+    def documents_path(self, meeting_id: str) -> str:
+        return os.path.join(self.directory, f"{meeting_id}.documents.json")
+
+    def lock_path(self, meeting_id: str) -> str:
+        return os.path.join(self.directory, f"{meeting_id}.lock")
+
+    def documents(self, meeting_id: str):
+        """Hashes of the documents attached to the meeting."""
+        path = self.documents_path(meeting_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_documents(self, meeting_id: str, documents):
+        path = self.documents_path(meeting_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(documents, f)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def meeting_lock(self, meeting_id: str):
+        """Exclusive lock on a meeting's index files, shared by every thread and process.
+
+        Writers run in API threads, ingestion processes and other server workers alike, so the
+        threading lock alone is not enough: an flock on indices/{meeting_id}.lock serialises them.
+        """
+        with self._lock:
+            thread_lock = self._meeting_locks.setdefault(meeting_id, threading.Lock())
+        with thread_lock:
+            path = self.lock_path(meeting_id)
+            while True:
+                f = open(path, "a")
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                # The file may have been deleted with its meeting while we waited; lock the new one then
+                try:
+                    if os.path.exists(path) and os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                        break
+                except FileNotFoundError:
+                    pass
+                f.close()
+            try:
+                yield
+            finally:
+                f.close()  # closing the file releases the flock
 
+    def get(self, meeting_id: str):
+        """Return the meeting's entry, loading it from disk on first use."""
+        with self._lock:
+            entry = self._entries.get(meeting_id)
+            if entry is not None:
+                self._entries.move_to_end(meeting_id)
+                return entry
+
+        entry = self.load(meeting_id)
+        if entry is not None:
+            self.put(meeting_id, entry)
+        return entry
+
+    def put(self, meeting_id: str, entry: IndexEntry):
+        with self._lock:
+            self._entries[meeting_id] = entry
+            self._entries.move_to_end(meeting_id)
+            self._evict()
+
+    def save_index(self, meeting_id: str, index):
+        """Atomically replace the meeting's index file."""
+        index_path = self.index_path(meeting_id)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, index_path)
+
+    def release(self, meeting_id: str):
+        """Drop the meeting's entry from memory without touching disk."""
+        with self._lock:
+            self._entries.pop(meeting_id, None)
+
+    def discard(self, meeting_id: str):
+        """Forget everything held in memory for the meeting."""
+        with self._lock:
+            self._entries.pop(meeting_id, None)
+            self._meeting_locks.pop(meeting_id, None)
+
+    def load(self, meeting_id: str, writable: bool = False):
+        """Read the meeting's entry from disk, bypassing the in-memory cache.
+
+        Read-only entries are memory-mapped when FAISS_MMAP is enabled, so a restarted
+        worker serves retrieval straight from the files without loading them into RAM.
+        """
+        index_path = self.index_path(meeting_id)
+        chunks_prefix = self.chunks_prefix(meeting_id)
+        if not os.path.exists(index_path) or not ChunkStore.exists(chunks_prefix):
+            return None
+
+        index = None
+        if settings.FAISS_MMAP and not writable:
+            flags = mmap_flags(index_path)
+            try:
+                if flags is not None:
+                    index = faiss.read_index(index_path, flags)
+            except RuntimeError as e:
+                logger.info(f"Memory-mapping the FAISS index for meeting {meeting_id} failed: {e}")
+            if index is None:
+                logger.info(f"FAISS index for meeting {meeting_id} cannot be memory-mapped by this faiss; reading it into memory")
+        mapped = index is not None
+        if index is None:
+            index = faiss.read_index(index_path)
+        index = configure_search(index)
+
+        chunks = ChunkStore(chunks_prefix)
+        if len(chunks) < index.ntotal:
+            logger.error(f"Chunk store for meeting {meeting_id} has {len(chunks)} rows for {index.ntotal} vectors")
+        logger.info(f"Loaded FAISS index for meeting {meeting_id} ({index.ntotal} vectors)")
+        return IndexEntry(index, chunks, mapped)
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it alone exceeds the budget
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while (total > self.memory_budget or len(self._entries) > self.max_entries) and len(self._entries) > 1:
+            meeting_id, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            logger.info(f"Evicted FAISS index for meeting {meeting_id} from memory")
+
+
+registry = FaissIndexRegistry(
+    INDEX_DIRECTORY,
+    settings.FAISS_MEMORY_BUDGET_MB * 1024 * 1024,
+    settings.FAISS_MAX_CACHED_INDICES
+)
+
+
+def iter_pdf_chunks(file_path: str):
+    """Yield (text, metadata) chunks page by page, so the whole document is never held in memory."""
+    from langchain.document_loaders import PyMuPDFLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    loader = PyMuPDFLoader(file_path)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=100,
         separators=["\n\n", "\n", " "]
     )
-    
-    # Split documents into chunks and retain original text
-    document_chunks = text_splitter.split_documents(documents)
-
-    # Store chunks globally
-    chunks.extend([chunk.page_content for chunk in document_chunks])
-
-    # Generate embeddings for each chunk
-    embeddings = [model.encode(chunk.page_content).astype('float32') for chunk in document_chunks]
-    embedding_matrix = np.array(embeddings)
-
-    index_path = os.path.join(INDEX_DIRECTORY, f"{meeting_id}.faiss")
-    # Load or create FAISS index
-    if os.path.exists(index_path):
-        index = faiss.read_index(index_path)
-    else:
-        dimension = embedding_matrix.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-
-    # Add embeddings to the FAISS index
-    index.add(embedding_matrix)
-    
-    # Save the updated index
-    faiss.write_index(index, index_path)
-
-def query_faiss_index(transcription, k=5):
-    global chunks, index  # Indicate that we are using the global variables
-    
-    if index is None:
+
+    source = os.path.basename(file_path)
+    for page in loader.lazy_load():
+        for chunk in text_splitter.split_documents([page]):
+            yield chunk.page_content, {"source": source, "page": chunk.metadata.get("page")}
+
+def document_prefix(doc_hash: str) -> str:
+    return os.path.join(EMBEDDING_DIRECTORY, doc_hash)
+
+def is_document_embedded(doc_hash: str) -> bool:
+    prefix = document_prefix(doc_hash)
+    return ChunkStore.exists(prefix) and os.path.exists(prefix + VECTORS_SUFFIX)
+
+def load_document_vectors(doc_hash: str, count: int):
+    """Memory-map a cached document's (count, dimension) float32 embedding matrix."""
+    path = document_prefix(doc_hash) + VECTORS_SUFFIX
+    dimension = os.path.getsize(path) // (4 * count)
+    return np.memmap(path, dtype='float32', mode='r', shape=(count, dimension))
+
+def embed_document(file_path: str, doc_hash: str, batch_size: int = settings.EMBEDDING_BATCH_SIZE):
+    """Chunk and embed a document once into the shared, content-addressed embedding cache."""
+    backend = get_backend()
+    dimension = backend.dimension
+    buffer = np.empty((batch_size, dimension), dtype='float32')
+    prefix = document_prefix(doc_hash)
+    chunks = ChunkStoreWriter(prefix, append=False)
+    vectors_tmp = f"{prefix}{VECTORS_SUFFIX}.{os.getpid()}.tmp"
+
+    try:
+        with open(vectors_tmp, "wb") as vectors:
+            def flush(batch):
+                # Embed the batch into the preallocated buffer and append it to the vector file
+                size = len(batch)
+                buffer[:size] = backend.encode([text for text, _ in batch], batch_size=size)
+                vectors.write(buffer[:size].tobytes())
+                for text, metadata in batch:
+                    chunks.add(text, metadata)
+
+            batch = []
+            for chunk in iter_pdf_chunks(file_path):
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+            vectors.flush()
+            os.fsync(vectors.fileno())
+
+        chunks.commit()
+        os.replace(vectors_tmp, prefix + VECTORS_SUFFIX)
+    except BaseException:
+        chunks.abort()
+        if os.path.exists(vectors_tmp):
+            os.remove(vectors_tmp)
+        raise
+    logger.info(f"Embedded {len(chunks)} chunks of {file_path} as document {doc_hash}")
+
+def attach_needs_rebuild(doc_hash: str, meeting_id: str) -> bool:
+    """Whether attaching the cached document would make the meeting's index outgrow its type."""
+    entry = registry.get(meeting_id)
+    count = len(ChunkStore(document_prefix(doc_hash)))
+    if entry is None:
+        return should_rebuild(FLAT, count)
+    return should_rebuild(index_kind(entry.index), entry.index.ntotal + count)
+
+def attach_document(doc_hash: str, meeting_id: str, rebuild: bool = True, batch_size: int = settings.EMBEDDING_BATCH_SIZE):
+    """Add a cached document's chunks and vectors to the meeting's index without re-encoding.
+
+    With rebuild=False an index that has outgrown its type is only appended to; the rebuild
+    is left to the next attach, which callers then run where CPU-heavy work belongs.
+    """
+    with registry.meeting_lock(meeting_id):
+        documents = registry.documents(meeting_id)
+        if doc_hash in documents:
+            logger.info(f"Document {doc_hash} is already attached to meeting {meeting_id}")
+            return
+
+        source = ChunkStore(document_prefix(doc_hash))
+        if not len(source):
+            logger.info(f"No text extracted from document {doc_hash}")
+            return
+        vectors = load_document_vectors(doc_hash, len(source))
+
+        # Build on a private, writable copy so concurrent queries keep using the cached entry
+        entry = registry.load(meeting_id, writable=True)
+        index = entry.index if entry is not None else faiss.IndexFlatL2(vectors.shape[1])
+        chunks = ChunkStoreWriter(registry.chunks_prefix(meeting_id))
+
+        try:
+            for start in range(0, len(source), batch_size):
+                index.add(np.ascontiguousarray(vectors[start:start + batch_size]))
+            for i in range(len(source)):
+                chunks.add(source[i], source.metadata(i))
+
+            # Chunks are appended to the current index; once the corpus outgrows its type (flat, then
+            # HNSW, then IVF), the vectors are rebuilt into the next one
+            if should_rebuild(index_kind(index), index.ntotal):
+                kind = choose_index_kind(index.ntotal)
+                if rebuild:
+                    logger.info(f"Rebuilding FAISS index for meeting {meeting_id} as {kind}")
+                    index = build_index(index.reconstruct_n(0, index.ntotal), kind)
+                else:
+                    logger.info(f"Deferring the rebuild of the FAISS index for meeting {meeting_id} as {kind}")
+
+            # Chunk rows are committed before the index, so every vector id always has its text
+            chunks.commit()
+            registry.save_index(meeting_id, index)
+            registry.save_documents(meeting_id, documents + [doc_hash])
+        except BaseException:
+            chunks.abort()
+            raise
+
+        # Drop the stale entry; the next query maps the new files from disk
+        registry.release(meeting_id)
+        logger.info(f"Attached {len(source)} chunks of document {doc_hash} to meeting {meeting_id}")
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def process_and_index_pdf(file_path: str, meeting_id: str, doc_hash: str = None):
+    """Index a PDF for the meeting, embedding it only if its content has not been seen before."""
+    doc_hash = doc_hash or file_hash(file_path)
+    if not is_document_embedded(doc_hash):
+        embed_document(file_path, doc_hash)
+    attach_document(doc_hash, meeting_id)
+
+def transcript_windows(transcription: str, window_words: int, count: int):
+    """Split the transcript into fixed word windows and return the most recent ones.
+
+    Window boundaries are counted from the start of the text, so as the transcript grows
+    only the last window changes and earlier windows keep hitting the embedding cache.
+    """
+    words = transcription.split()
+    windows = [" ".join(words[start:start + window_words]) for start in range(0, len(words), window_words)]
+    return windows[-count:]
+
+def embed_windows(windows):
+    """Embed transcript windows, encoding only those not already in the cache."""
+    keys = [content_hash(window) for window in windows]
+    with window_cache_lock:
+        cached = {key: window_cache[key] for key in keys if key in window_cache}
+        for key in cached:
+            window_cache.move_to_end(key)
+
+    missing = [(key, window) for key, window in zip(keys, windows) if key not in cached]
+    if missing:
+        vectors = get_backend().encode([window for _, window in missing], batch_size=len(missing))
+        with window_cache_lock:
+            for (key, _), vector in zip(missing, vectors):
+                cached[key] = window_cache[key] = vector.astype('float32')
+            while len(window_cache) > WINDOW_CACHE_SIZE:
+                window_cache.popitem(last=False)
+
+    return np.stack([cached[key] for key in keys])
+
+def search_faiss_index(transcription, meeting_id, k=5):
+    """Search the meeting's index with the recent transcript windows.
+
+    Returns the index entry, the window embeddings used as queries and the ids of the
+    best k chunks, nearest first.
+    """
+    entry = registry.get(meeting_id)
+    if entry is None:
         raise Exception("FAISS index has not been initialized. Please process and index a PDF first.")
-    
-    # Step 1: Embed the transcription
-    transcription_embedding = model.encode(transcription).astype('float32')
-    
-    # Step 2: Search in the FAISS index
-    distances, indices = index.search(np.array([transcription_embedding]), k)  # k = number of nearest neighbors you want
-    
-    # Step 3: Retrieve relevant chunks based on indices
-    relevant_chunks = [chunks[i] for i in indices[0]]  # Assuming chunks holds the original text or context
-    return relevant_chunks
-
-def delete_faiss_index(index_path="indices/vector_index.faiss"):
-    """Deletes the FAISS index file if it exists."""
+
+    # Step 1: Embed the recent transcript windows (MiniLM truncates anything longer than 256 word pieces)
+    windows = transcript_windows(transcription, settings.RETRIEVAL_WINDOW_WORDS, settings.RETRIEVAL_WINDOW_COUNT)
+    if not windows:
+        return entry, None, []
+    queries = embed_windows(windows)
+
+    # Step 2: Search the FAISS index with every window at once
+    distances, indices = entry.index.search(queries, k)
+
+    # Step 3: Merge the hits, keeping each chunk's best distance (-1 marks missing neighbours)
+    best = {}
+    for row_distances, row_indices in zip(distances, indices):
+        for distance, i in zip(row_distances, row_indices):
+            if i >= 0 and distance < best.get(i, float("inf")):
+                best[i] = distance
+    return entry, queries, sorted(best, key=best.get)[:k]
+
+def query_faiss_index(transcription, meeting_id, k=5):
+    entry, _, ranked = search_faiss_index(transcription, meeting_id, k)
+    return [entry.chunks[i] for i in ranked]
+
+def delete_faiss_index(meeting_id):
+    """Releases the meeting's FAISS index from memory and deletes its files."""
     try:
-        if os.path.exists(index_path):
-            os.remove(index_path)
-        else:
-            print(f"No FAISS index found at {index_path}.")
+        # Wait for any document still being attached, so it cannot recreate the files afterwards
+        with registry.meeting_lock(meeting_id):
+            index_path = registry.index_path(meeting_id)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            else:
+                logger.info(f"No FAISS index found at {index_path}.")
+            delete_chunk_store(registry.chunks_prefix(meeting_id))
+            if os.path.exists(registry.documents_path(meeting_id)):
+                os.remove(registry.documents_path(meeting_id))
+            os.remove(registry.lock_path(meeting_id))
     except Exception as e:
-        print(f"Error while deleting FAISS index: {str(e)}")
+        logger.error(f"Error while deleting FAISS index for meeting {meeting_id}: {e}")
+    registry.discard(meeting_id)
@@ -0,0 +1,65 @@
+import struct
+
+# Binary audio frame: 1 byte version, 1 byte frame type, 4 byte big-endian sequence number, then the payload
+HEADER = struct.Struct("!BBI")
+PROTOCOL_VERSION = 1
+
+# Raw 16 kHz mono 16-bit little-endian PCM
+FRAME_PCM = 0x01
+# One complete Ogg/Opus file holding a whole utterance, forwarded to Whisper as-is. Frames are
+# not merged, so clients must cut utterances themselves instead of streaming 20 ms packets
+FRAME_OPUS = 0x02
+
+FRAME_TYPES = {FRAME_PCM, FRAME_OPUS}
+
+# Query parameter value clients pass on connect to opt into binary frames
+BINARY_PROTOCOL = "binary"
+
+
+# Ogg page: "OggS", version, header type, granule position, serial, page number, CRC, segment count
+OGG_PAGE = struct.Struct("<4sBBqIIIB")
+OGG_FIRST_PAGE = 0x02
+OGG_LAST_PAGE = 0x04
+
+
+class FrameError(ValueError):
+    pass
+
+
+def check_ogg_opus(payload: bytes):
+    """Reject a payload that is not a complete Ogg/Opus file, e.g. a continuation page of a stream."""
+    position = 0
+    header_type = 0
+    while position < len(payload):
+        if len(payload) - position < OGG_PAGE.size:
+            raise FrameError("Opus frame ends inside an Ogg page header")
+        magic, _, header_type, _, _, _, _, segment_count = OGG_PAGE.unpack_from(payload, position)
+        if magic != b"OggS":
+            raise FrameError("Opus frame is not an Ogg stream")
+        body = position + OGG_PAGE.size + segment_count
+        if position == 0 and not (header_type & OGG_FIRST_PAGE and payload[body:body + 8] == b"OpusHead"):
+            raise FrameError("Opus frame does not start with the Opus headers")
+        position = body + sum(payload[body - segment_count:body])
+    if position != len(payload) or not header_type & OGG_LAST_PAGE:
+        raise FrameError("Opus frame does not end the Ogg stream")
+
+
+def parse_frame(data: bytes):
+    """Split a binary frame into (frame_type, sequence, payload)."""
+    if len(data) < HEADER.size:
+        raise FrameError("Frame is shorter than its header")
+
+    version, frame_type, sequence = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise FrameError(f"Unsupported frame version {version}")
+    if frame_type not in FRAME_TYPES:
+        raise FrameError(f"Unknown frame type {frame_type}")
+    payload = data[HEADER.size:]
+    if frame_type == FRAME_OPUS:
+        check_ogg_opus(payload)
+    return frame_type, sequence, payload
+
+
+def build_frame(frame_type: int, sequence: int, payload: bytes) -> bytes:
+    """Inverse of parse_frame: the layout clients must send."""
+    return HEADER.pack(PROTOCOL_VERSION, frame_type, sequence) + payload
@@ -0,0 +1,117 @@
+import math
+import faiss
+from core.config import settings
+
+FLAT = "flat"
+HNSW = "hnsw"
+IVF_PQ = "ivfpq"
+IVF_SQ8 = "sq8"
+INDEX_KINDS = (FLAT, HNSW, IVF_PQ, IVF_SQ8)
+IVF_KINDS = (IVF_PQ, IVF_SQ8)
+# Growing corpora only ever move up this order: flat, then HNSW, then an IVF type
+KIND_RANKS = {FLAT: 0, HNSW: 1, IVF_PQ: 2, IVF_SQ8: 2}
+
+# Neighbours per HNSW node
+HNSW_M = 32
+# Dimensions per PQ sub-quantizer (all-MiniLM-L6-v2: 384 dims -> 48 bytes per vector)
+PQ_DIMS_PER_CODE = 8
+# Fewer vectors than this cannot train 256-centroid PQ codebooks reliably
+MIN_TRAINING_VECTORS = 10000
+# Zero-copy mapping of flat codes (flat indices and HNSW storage), only in recent faiss releases;
+# IO_FLAG_MMAP itself maps nothing but IVF inverted lists
+IO_FLAG_MMAP_IFC = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+
+
+def choose_index_kind(count: int) -> str:
+    """Pick an index type for a corpus of count vectors, honouring FAISS_INDEX_TYPE when it is not 'auto'."""
+    if settings.FAISS_INDEX_TYPE != "auto":
+        if settings.FAISS_INDEX_TYPE in IVF_KINDS and count < MIN_TRAINING_VECTORS:
+            return FLAT
+        return settings.FAISS_INDEX_TYPE
+    if count < settings.FAISS_HNSW_MIN_VECTORS:
+        return FLAT  # exact search is fast enough for small corpora
+    if count < max(settings.FAISS_IVF_MIN_VECTORS, MIN_TRAINING_VECTORS):
+        return HNSW  # low latency, full vectors in RAM
+    return IVF_PQ  # compact codes for large libraries
+
+
+def should_rebuild(kind: str, count: int) -> bool:
+    """Whether an index of the given kind holding count vectors has outgrown its type."""
+    return KIND_RANKS[choose_index_kind(count)] > KIND_RANKS[kind]
+
+
+def factory_string(kind: str, count: int, dimension: int) -> str:
+    if kind == FLAT:
+        return "Flat"
+    if kind == HNSW:
+        return f"HNSW{HNSW_M}"
+
+    # Roughly 4 * sqrt(n) lists, leaving at least 39 training points per list
+    nlist = max(1, min(int(4 * math.sqrt(count)), count // 39))
+    if kind == IVF_PQ:
+        return f"IVF{nlist},PQ{dimension // PQ_DIMS_PER_CODE}"
+    if kind == IVF_SQ8:
+        return f"IVF{nlist},SQ8"
+    raise ValueError(f"Unknown FAISS index type: {kind}")
+
+
+def index_kind(index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return HNSW
+    if isinstance(index, faiss.IndexIVFPQ):
+        return IVF_PQ
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return IVF_SQ8
+    return FLAT
+
+
+def mmap_flags(path: str):
+    """faiss.read_index flags that memory-map the index file at path, or None if its type cannot be mapped."""
+    with open(path, "rb") as f:
+        fourcc = f.read(4)
+    if fourcc.startswith(b"Iw"):  # every IVF index type
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    if IO_FLAG_MMAP_IFC is not None:
+        return IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    return None
+
+
+def index_nbytes(index, mapped: bool = False) -> int:
+    """Approximate resident size of the index's vectors.
+
+    Mapped vectors are not counted, like mapped chunk text: their pages belong to the OS page cache.
+    """
+    kind = index_kind(index)
+    if kind == HNSW:
+        per_vector = (0 if mapped else index.d * 4) + HNSW_M * 2 * 4
+    elif kind == IVF_PQ:
+        per_vector = (0 if mapped else index.d // PQ_DIMS_PER_CODE) + 8
+    elif kind == IVF_SQ8:
+        per_vector = (0 if mapped else index.d) + 8
+    else:
+        per_vector = 0 if mapped else index.d * 4
+    return index.ntotal * per_vector
+
+
+def configure_search(index):
+    """Apply the search-time parameters and make vectors reconstructable (used by MMR)."""
+    kind = index_kind(index)
+    if kind == HNSW:
+        index.hnsw.efSearch = settings.FAISS_EF_SEARCH
+    elif kind in (IVF_PQ, IVF_SQ8):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = settings.FAISS_NPROBE
+        ivf.make_direct_map()
+    return index
+
+
+def build_index(vectors, kind: str):
+    """Create an index of the given kind, train it on the vectors if needed and add them."""
+    count, dimension = vectors.shape
+    # index_factory and read_index already return the concrete index class; downcast_index would
+    # hand back a non-owning proxy and free the index while it is still in use
+    index = faiss.index_factory(dimension, factory_string(kind, count, dimension), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return configure_search(index)
@@ -0,0 +1,110 @@
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from core.config import settings
+from services.fais import process_and_index_pdf, attach_document, attach_needs_rebuild, is_document_embedded, registry
+from services.job_store import JobStatus, create_job, set_job_status, get_job
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueueFull(Exception):
+    pass
+
+
+def run_job(job_id: str, function, *args):
+    """Run an ingestion job, recording its progress in the shared job store.
+
+    Runs inside the ingestion process or thread, so RUNNING is only reported once the job
+    has actually started rather than when it was handed to the pool.
+    """
+    set_job_status(job_id, JobStatus.RUNNING)
+    try:
+        function(*args)
+    except Exception as e:
+        set_job_status(job_id, JobStatus.FAILED, str(e))
+        raise
+    set_job_status(job_id, JobStatus.DONE)
+
+
+class IngestionExecutor:
+    """Runs PDF ingestion in worker processes, away from the API event loop.
+
+    Documents whose embeddings are already cached only need attaching to the meeting's
+    index, which is cheap enough to run on a thread in this process unless the index has
+    to be rebuilt as a larger type; those attaches go to the worker processes too.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._attach_pool = ThreadPoolExecutor(max_workers=1)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, file_path: str, meeting_id: str, doc_hash: str) -> str:
+        """Queue a document for indexing and return its job id.
+
+        Blocks on the job store, so call it off the event loop.
+        """
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                raise IngestionQueueFull(f"{len(self._pending)} ingestion jobs are already pending.")
+
+            # A concurrent attach may still grow the index past its type; the rebuild then waits for the next one
+            attach_here = is_document_embedded(doc_hash) and not attach_needs_rebuild(doc_hash, meeting_id)
+            job_id = create_job(meeting_id)
+            if attach_here:
+                future = self._attach_pool.submit(run_job, job_id, attach_document, doc_hash, meeting_id, False)
+            else:
+                if self._pool is None:
+                    # Spawned workers avoid inheriting the API process's threads and event loop
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                future = self._pool.submit(run_job, job_id, process_and_index_pdf, file_path, meeting_id, doc_hash)
+            self._pending.add(future)
+
+        future.add_done_callback(lambda f: self._on_done(job_id, meeting_id, f))
+        return job_id
+
+    def status(self, job_id: str):
+        """Return the job's status, or None if the job is unknown; jobs of every worker are visible."""
+        return get_job(job_id)
+
+    def shutdown(self):
+        self._attach_pool.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _on_done(self, job_id: str, meeting_id: str, future):
+        with self._lock:
+            self._pending.discard(future)
+        error = _job_error(future)
+        if error:
+            logger.error(f"Ingestion job {job_id} for meeting {meeting_id} failed: {error}")
+            try:
+                # The job could not record its own failure if it was cancelled or its process died
+                if get_job(job_id)["status"] != JobStatus.FAILED.value:
+                    set_job_status(job_id, JobStatus.FAILED, error)
+            except Exception as e:
+                logger.error(f"Recording the failure of ingestion job {job_id} failed: {e}")
+        else:
+            # The worker wrote a new index to disk; drop the stale copy so it is reloaded
+            registry.release(meeting_id)
+            logger.info(f"Ingestion job {job_id} for meeting {meeting_id} finished")
+
+
+def _job_error(future):
+    if future.cancelled():
+        return "Job was cancelled"
+    if future.exception() is not None:
+        return str(future.exception())
+    return None
+
+
+ingestion_executor = IngestionExecutor(settings.INGEST_WORKERS, settings.INGEST_MAX_PENDING_JOBS)
@@ -0,0 +1,64 @@
+import threading
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from pymongo import MongoClient
+from core.config import settings
+
+JOBS_COLLECTION = "ingestion_jobs"
+# MongoDB expires job records this long after their last update, so clients can still poll finished jobs
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+# Synchronous client, usable from ingestion processes and executor threads that have no event loop
+_collection = None
+_collection_lock = threading.Lock()
+
+
+def jobs_collection():
+    """Return the ingestion job collection, connecting on first use in this process."""
+    global _collection
+    if _collection is None:
+        with _collection_lock:
+            if _collection is None:
+                collection = MongoClient(settings.MONGODB_URL)[settings.DB_NAME][JOBS_COLLECTION]
+                collection.create_index("updated_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+                _collection = collection
+    return _collection
+
+
+def create_job(meeting_id: str) -> str:
+    """Record a queued job, shared by every worker and node, and return its id."""
+    job_id = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    jobs_collection().insert_one({
+        "_id": job_id,
+        "meeting_id": meeting_id,
+        "status": JobStatus.QUEUED.value,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    })
+    return job_id
+
+
+def set_job_status(job_id: str, status: JobStatus, error: str = None):
+    jobs_collection().update_one(
+        {"_id": job_id},
+        {"$set": {"status": status.value, "error": error, "updated_at": datetime.now(timezone.utc)}}
+    )
+
+
+def get_job(job_id: str):
+    """Return the job's status, or None if the job is unknown."""
+    job = jobs_collection().find_one({"_id": job_id})
+    if job is None:
+        return None
+    return {"job_id": job["_id"], "meeting_id": job["meeting_id"], "status": job["status"], "error": job["error"]}
@@ -0,0 +1,70 @@
+import json
+
+
+class JsonItemStream:
+    """Incrementally scans a streamed JSON object and picks out completed array items.
+
+    Feed it the model's reply as it arrives; each call returns (key, item) pairs for the
+    elements of the object's top-level arrays that have been fully received so far, e.g.
+    ("titles", {...}) as soon as a title's closing brace streams in. Anything before the
+    opening brace, such as a ```json fence, is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None
+        self.array_key = None
+        self.item_start = None
+
+    def feed(self, text: str):
+        self.buffer += text
+        items = []
+        while self.position < len(self.buffer):
+            i = self.position
+            char = self.buffer[i]
+            self.position += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self.last_string = self.buffer[self.string_start + 1:i]
+                continue
+
+            if self.depth == 2 and self.array_key is not None and self.item_start is None and char not in " \t\r\n,]":
+                self.item_start = i
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = i
+            elif char in "{[":
+                if self.depth == 1 and char == "[":
+                    self.array_key = self.last_string
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 2 and char == "]":
+                    self._emit(i, items)
+                    self.array_key = None
+                self.depth -= 1
+            elif char == "," and self.depth == 2:
+                self._emit(i, items)
+        return items
+
+    def _emit(self, end: int, items):
+        if self.item_start is None or self.array_key is None:
+            return
+        raw = self.buffer[self.item_start:end].strip()
+        self.item_start = None
+        try:
+            items.append((self.array_key, json.loads(raw)))
+        except json.JSONDecodeError:
+            pass
@@ -0,0 +1,57 @@
+import asyncio
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from core.config import settings
+
+# One connection pool shared by every meeting on this worker
+client = AsyncOpenAI(
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS
+        )
+    )
+)
+
+# Separate caps so long GPT-4o calls cannot starve live transcription
+transcription_slots = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENT_TRANSCRIPTIONS)
+completion_slots = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENT_COMPLETIONS)
+
+
+async def create_translation(file):
+    """Translate/transcribe an audio file with Whisper."""
+    async with transcription_slots:
+        return await client.audio.translations.create(
+            model="whisper-1",
+            file=file,
+            timeout=settings.OPENAI_TRANSCRIPTION_TIMEOUT
+        )
+
+
+async def create_chat_completion(messages, **kwargs):
+    """Run a GPT-4o chat completion."""
+    async with completion_slots:
+        return await client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            timeout=settings.OPENAI_COMPLETION_TIMEOUT,
+            **kwargs
+        )
+
+
+async def stream_chat_completion(messages):
+    """Run a streamed GPT-4o chat completion, yielding content deltas as they arrive."""
+    async with completion_slots:
+        stream = await client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            timeout=settings.OPENAI_COMPLETION_TIMEOUT,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+async def close():
+    await client.close()
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough GPT token count (about four characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+class AnalysisScheduler:
+    """Runs a meeting's periodic analysis in the background.
+
+    Analysis fires once `interval` seconds have passed or `token_threshold` new tokens have
+    arrived, whichever comes first, and only if there is new speech. At most one analysis
+    is in flight; triggers that arrive while it runs are coalesced into a single follow-up run.
+    """
+
+    def __init__(self, meeting_id: str, run, interval: float, token_threshold: int):
+        self.meeting_id = meeting_id
+        self.run = run
+        self.interval = interval
+        self.token_threshold = token_threshold
+        self.pending_tokens = 0
+        self.last_run = time.monotonic()
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._loop())
+
+    def notify(self, text: str):
+        """Record newly transcribed text, waking the scheduler once enough has accumulated."""
+        self.pending_tokens += estimate_tokens(text)
+        if self.pending_tokens >= self.token_threshold:
+            self.wakeup.set()
+
+    def cancel(self):
+        self.task.cancel()
+
+    async def _loop(self):
+        while True:
+            remaining = self.interval - (time.monotonic() - self.last_run)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            due = time.monotonic() - self.last_run >= self.interval
+            if not self.pending_tokens:
+                if due:
+                    self.last_run = time.monotonic()
+                continue
+            if not due and self.pending_tokens < self.token_threshold:
+                continue
+
+            self.pending_tokens = 0
+            self.last_run = time.monotonic()
+            try:
+                await self.run(self.meeting_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analysis for meeting {self.meeting_id} failed: {e}")
+
+
+# Analysis schedulers of meetings with participants connected to this worker
+schedulers = {}
+
+
+def get_scheduler(meeting_id: str, run) -> AnalysisScheduler:
+    """Return the meeting's scheduler, starting one that calls run(meeting_id) if needed."""
+    scheduler = schedulers.get(meeting_id)
+    if scheduler is None:
+        scheduler = schedulers[meeting_id] = AnalysisScheduler(
+            meeting_id,
+            run,
+            settings.ANALYSIS_INTERVAL_SECONDS,
+            settings.ANALYSIS_TOKEN_THRESHOLD
+        )
+    return scheduler
+
+
+def stop_scheduler(meeting_id: str):
+    scheduler = schedulers.pop(meeting_id, None)
+    if scheduler is not None:
+        scheduler.cancel()
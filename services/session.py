@@ -0,0 +1,159 @@
+import os
+import json
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple
+from core.config import settings
+from services.vad import VadStats
+from services.audio_encoding import EncodingStats
+
+SESSION_DIRECTORY = "sessions"
+os.makedirs(SESSION_DIRECTORY, exist_ok=True)
+
+
+def session_path(meeting_id: str, directory: str = SESSION_DIRECTORY) -> str:
+    return os.path.join(directory, f"{meeting_id}.jsonl")
+
+
+def state_path(meeting_id: str, directory: str = SESSION_DIRECTORY) -> str:
+    return os.path.join(directory, f"{meeting_id}.state.json")
+
+
+class Segment(NamedTuple):
+    speaker: str
+    text: str
+    timestamp: datetime
+
+    def render(self) -> str:
+        return f"{self.speaker}: {self.text}"
+
+
+class MeetingSession:
+    """Transcript shared by every participant of a meeting.
+
+    Segments are appended to an in-memory tail; once it grows past max_segments the
+    oldest half is spilled to a JSON-lines file so multi-hour meetings stay bounded.
+    """
+
+    def __init__(self, meeting_id: str, max_segments: int, directory: str = SESSION_DIRECTORY):
+        self.meeting_id = meeting_id
+        self.max_segments = max_segments
+        self.spill_path = session_path(meeting_id, directory)
+        self.state_path = state_path(meeting_id, directory)
+        self.segments = deque()
+        self.spilled_count = 0
+
+        # Incremental analysis state: segments already analysed, a compact summary of them and the last result
+        self.analyzed_position = 0
+        self.rolling_summary = ""
+        self.last_analysis = None
+
+        # Audio skipped or trimmed by voice-activity detection
+        self.vad = VadStats()
+        # Size and encode time of the audio uploaded for transcription
+        self.encoding = EncodingStats()
+
+        # Resume a meeting whose session was released while it was idle
+        if os.path.exists(self.spill_path):
+            self.spilled_count = sum(1 for _ in self._read_spilled())
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.analyzed_position = min(state["analyzed_position"], self.spilled_count)
+            self.rolling_summary = state["rolling_summary"]
+            self.last_analysis = state["last_analysis"]
+
+    @property
+    def segment_count(self) -> int:
+        return self.spilled_count + len(self.segments)
+
+    def append(self, speaker: str, text: str, timestamp: datetime = None) -> Segment:
+        segment = Segment(speaker, text, timestamp or datetime.now())
+        self.segments.append(segment)
+        if len(self.segments) > self.max_segments:
+            self.spill(len(self.segments) // 2)
+        return segment
+
+    def since(self, position: int):
+        """Segments from the given position (0 = start of the meeting) onwards."""
+        if position >= self.spilled_count:
+            return list(self.segments)[position - self.spilled_count:]
+        spilled = list(self._read_spilled())[position:]
+        return spilled + list(self.segments)
+
+    def full_text(self) -> str:
+        """Whole meeting transcript, including spilled segments."""
+        segments = list(self._read_spilled()) if self.spilled_count else []
+        segments.extend(self.segments)
+        return "\n".join(segment.render() for segment in segments)
+
+    def spill(self, count: int = None):
+        """Move the oldest count segments (all by default) from memory to the spill file."""
+        count = len(self.segments) if count is None else count
+        if count <= 0:
+            return
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for _ in range(count):
+                segment = self.segments.popleft()
+                self.spilled_count += 1
+                f.write(json.dumps({
+                    "speaker": segment.speaker,
+                    "text": segment.text,
+                    "timestamp": segment.timestamp.isoformat()
+                }) + "\n")
+
+    def save_state(self):
+        """Write the incremental analysis state next to the spill file, so a resumed session keeps it."""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "analyzed_position": self.analyzed_position,
+                "rolling_summary": self.rolling_summary,
+                "last_analysis": self.last_analysis
+            }, f)
+        os.replace(tmp_path, self.state_path)
+
+    def discard(self):
+        """Delete the meeting's spilled transcript and analysis state."""
+        self.segments.clear()
+        for path in (self.spill_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _read_spilled(self):
+        if not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                data = json.loads(line)
+                yield Segment(data["speaker"], data["text"], datetime.fromisoformat(data["timestamp"]))
+
+
+# Sessions of meetings with participants connected to this worker
+sessions = {}
+
+
+def get_session(meeting_id: str) -> MeetingSession:
+    session = sessions.get(meeting_id)
+    if session is None:
+        session = sessions[meeting_id] = MeetingSession(meeting_id, settings.SESSION_MAX_SEGMENTS)
+    return session
+
+
+def release_session(meeting_id: str):
+    """Spill an idle meeting's transcript to disk and drop it from memory."""
+    session = sessions.pop(meeting_id, None)
+    if session is not None:
+        session.spill()
+        session.save_state()
+
+
+def close_session(meeting_id: str):
+    """Forget a finished meeting's transcript entirely."""
+    session = sessions.pop(meeting_id, None)
+    if session is not None:
+        session.discard()
+    else:
+        for path in (session_path(meeting_id), state_path(meeting_id)):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from beanie import PydanticObjectId
+from pymongo.errors import BulkWriteError
+from core.config import settings
+from models.transcript import Transcript
+from services.session import Segment
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class TranscriptWriter:
+    """Write-behind persistence of transcript segments to MongoDB.
+
+    Segments are buffered per meeting and written with one insert_many once a meeting has
+    batch_size of them or flush_interval seconds have passed, so publishing a transcription
+    never waits on the database. Segments of a failed write are kept for the next attempt,
+    up to max_buffered per meeting (oldest dropped first); they get their _id when buffered,
+    so a retry skips the ones an attempt reported as failed had already written.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_buffered: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.buffers = defaultdict(list)
+        self.locks = defaultdict(asyncio.Lock)
+        self.flushes = defaultdict(int)
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the background flusher and write out everything still buffered."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.flush_all()
+
+    def add(self, meeting_id: str, segment: Segment):
+        buffer = self.buffers[meeting_id]
+        buffer.append(Transcript(
+            id=PydanticObjectId(),
+            meeting_id=meeting_id,
+            speaker=segment.speaker,
+            text=segment.text,
+            timestamp=segment.timestamp
+        ))
+        if len(buffer) >= self.batch_size:
+            self.wakeup.set()
+
+    async def flush(self, meeting_id: str):
+        """Write a meeting's buffered segments now (e.g. when it ends)."""
+        self.flushes[meeting_id] += 1
+        try:
+            async with self.locks[meeting_id]:
+                documents = self.buffers.pop(meeting_id, None)
+                if not documents:
+                    return
+                try:
+                    await insert_segments(documents)
+                except Exception as e:
+                    logger.error(f"Persisting {len(documents)} transcript segments of meeting {meeting_id} failed: {e}")
+                    # Put them back ahead of anything buffered meanwhile, so order is kept on retry
+                    buffer = documents + self.buffers.get(meeting_id, [])
+                    if len(buffer) > self.max_buffered:
+                        logger.error(f"Dropping {len(buffer) - self.max_buffered} transcript segments of meeting {meeting_id}")
+                        buffer = buffer[-self.max_buffered:]
+                    self.buffers[meeting_id] = buffer
+        finally:
+            # Forget the lock once nothing is buffered or waiting, however the meeting ended
+            self.flushes[meeting_id] -= 1
+            if not self.flushes[meeting_id]:
+                del self.flushes[meeting_id]
+                if meeting_id not in self.buffers:
+                    self.locks.pop(meeting_id, None)
+
+    async def close(self, meeting_id: str):
+        """Final flush of an ended meeting."""
+        await self.flush(meeting_id)
+
+    async def flush_all(self):
+        await asyncio.gather(*(self.flush(meeting_id) for meeting_id in list(self.buffers)))
+
+    async def _loop(self):
+        last_flush = time.monotonic()
+        while True:
+            remaining = self.flush_interval - (time.monotonic() - last_flush)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            if time.monotonic() - last_flush >= self.flush_interval:
+                last_flush = time.monotonic()
+                await self.flush_all()
+            else:
+                # Woken by a full buffer: write only the meetings that reached batch_size
+                full = [meeting_id for meeting_id, buffer in self.buffers.items() if len(buffer) >= self.batch_size]
+                await asyncio.gather(*(self.flush(meeting_id) for meeting_id in full))
+
+
+async def insert_segments(documents):
+    """Insert the segments, treating those already written by an earlier attempt as success."""
+    try:
+        await Transcript.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if e.details.get("writeConcernErrors") or any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        logger.info(f"Skipped {len(errors)} transcript segments that were already persisted")
+
+
+transcript_writer = TranscriptWriter(
+    settings.TRANSCRIPT_BATCH_SIZE,
+    settings.TRANSCRIPT_FLUSH_SECONDS,
+    settings.TRANSCRIPT_MAX_BUFFERED
+)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from services.vad import pcm_seconds
+
+logger = logging.getLogger(__name__)
+
+# Extension of utterances queued as raw PCM, left to the transcribe callback to encode
+RAW_PCM = "pcm"
+
+
+class UtteranceAggregator:
+    """Merges consecutive PCM chunks of one meeting into utterances.
+
+    An utterance is released once it reaches target_seconds or a chunk ends in a pause,
+    so short chunks share one Whisper call without splitting sentences arbitrarily.
+    """
+
+    def __init__(self, target_seconds: float):
+        self.target_seconds = target_seconds
+        self.meeting_id = None
+        self.chunks = []
+        self.size = 0
+
+    def add(self, meeting_id: str, pcm: bytes, pause: bool = False):
+        """Add a chunk, returning the (meeting_id, pcm) utterances it completes."""
+        ready = []
+        if self.chunks and meeting_id != self.meeting_id:
+            ready.append(self.flush())
+        self.meeting_id = meeting_id
+        self.chunks.append(pcm)
+        self.size += len(pcm)
+        if pause or pcm_seconds(self.size) >= self.target_seconds:
+            ready.append(self.flush())
+        return ready
+
+    def flush(self):
+        """Release whatever has accumulated as an utterance, or None if nothing has."""
+        if not self.chunks:
+            return None
+        utterance = (self.meeting_id, b"".join(self.chunks))
+        self.chunks = []
+        self.size = 0
+        return utterance
+
+
+class TranscriptionPipeline:
+    """Transcribes one connection's audio concurrently while publishing results in order.
+
+    Utterances get a sequence number when they are submitted and are transcribed by a
+    bounded pool of workers; a reorder buffer hands results to on_result strictly in
+    sequence order. Submitting blocks once max_pending utterances are queued, so a client
+    that outpaces Whisper is slowed down instead of growing memory.
+    """
+
+    def __init__(self, transcribe, on_result, workers: int, max_pending: int,
+                 target_seconds: float, idle_flush_seconds: float):
+        self.transcribe = transcribe  # async (meeting_id, audio_bytes, extension) -> text or None
+        self.on_result = on_result  # async (meeting_id, text)
+        self.aggregator = UtteranceAggregator(target_seconds)
+        self.idle_flush_seconds = idle_flush_seconds
+        self.idle_timer = None
+        self.idle_puts = set()
+
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.next_sequence = 0
+        self.next_emit = 0
+        self.results = {}
+        self.emit_lock = asyncio.Lock()
+        self.workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+
+    async def add_pcm(self, meeting_id: str, pcm: bytes, pause: bool = False):
+        """Queue voiced PCM, merging it with neighbouring chunks into utterances."""
+        self._cancel_idle_timer()
+        for meeting_id, utterance in self.aggregator.add(meeting_id, pcm, pause):
+            await self._submit(meeting_id, (utterance, RAW_PCM))
+        if self.aggregator.chunks:
+            # A speaker who stops sending mid-utterance still gets transcribed
+            self.idle_timer = asyncio.get_running_loop().call_later(self.idle_flush_seconds, self._flush_when_idle)
+
+    async def add_audio(self, meeting_id: str, audio_bytes: bytes, extension: str):
+        """Queue an already encoded, complete utterance (e.g. an Ogg/Opus file), which cannot be merged."""
+        await self.pause()
+        await self._submit(meeting_id, (audio_bytes, extension))
+
+    async def pause(self):
+        """Mark an utterance boundary, e.g. a chunk that was all silence."""
+        self._cancel_idle_timer()
+        utterance = self.aggregator.flush()
+        if utterance is not None:
+            meeting_id, pcm = utterance
+            await self._submit(meeting_id, (pcm, RAW_PCM))
+
+    async def drain(self):
+        """Transcribe and publish everything received so far."""
+        await self.pause()
+        await asyncio.gather(*self.idle_puts)
+        await self.queue.join()
+
+    async def close(self, drain: bool = True):
+        try:
+            if drain:
+                await self.drain()
+        finally:
+            self._cancel_idle_timer()
+            tasks = self.workers + list(self.idle_puts)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _submit(self, meeting_id: str, audio):
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        await self.queue.put((sequence, meeting_id, audio))
+
+    def _flush_when_idle(self):
+        self.idle_timer = None
+        utterance = self.aggregator.flush()
+        if utterance is not None:
+            meeting_id, pcm = utterance
+            # Reserve the sequence number now so later chunks cannot overtake this utterance
+            sequence = self.next_sequence
+            self.next_sequence += 1
+            task = asyncio.create_task(self.queue.put((sequence, meeting_id, (pcm, RAW_PCM))))
+            self.idle_puts.add(task)
+            task.add_done_callback(self.idle_puts.discard)
+
+    def _cancel_idle_timer(self):
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+
+    async def _work(self):
+        while True:
+            sequence, meeting_id, (audio_bytes, extension) = await self.queue.get()
+            try:
+                try:
+                    text = await self.transcribe(meeting_id, audio_bytes, extension)
+                except Exception as e:
+                    logger.error(f"Transcription of utterance {sequence} failed: {e}")
+                    text = None
+                self.results[sequence] = (meeting_id, text)
+                await self._emit_ready()
+            finally:
+                self.queue.task_done()
+
+    async def _emit_ready(self):
+        async with self.emit_lock:
+            while self.next_emit in self.results:
+                meeting_id, text = self.results.pop(self.next_emit)
+                self.next_emit += 1
+                if text:
+                    try:
+                        await self.on_result(meeting_id, text)
+                    except Exception as e:
+                        logger.error(f"Publishing transcription failed: {e}")
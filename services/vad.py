@@ -0,0 +1,72 @@
+import numpy as np
+
+# Audio from the client is 16-bit mono PCM at 16 kHz (see services.audio_encoding.encode_wav)
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+# Energy is measured over 30 ms frames
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def pcm_seconds(byte_count: int) -> float:
+    return byte_count / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+
+def frame_energies(samples: np.ndarray) -> np.ndarray:
+    """RMS energy of each 30 ms frame in dBFS; a trailing partial frame is zero-padded."""
+    frame_count = -(-len(samples) // FRAME_SAMPLES)
+    frames = np.zeros(frame_count * FRAME_SAMPLES, dtype=np.float32)
+    frames[:len(samples)] = samples
+    frames = frames.reshape(frame_count, FRAME_SAMPLES)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1.0) / 32768)
+
+
+def trim_silence(pcm: bytes, threshold_db: float, min_speech_ms: int, padding_ms: int):
+    """Cut leading and trailing silence from a PCM chunk.
+
+    Returns the voiced part with padding_ms of context on either side and whether the chunk
+    ended in a pause (trailing silence longer than the padding), or None when fewer than
+    min_speech_ms of frames are louder than threshold_db (the chunk is silence).
+    """
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH], dtype="<i2")
+    if len(samples) == 0:
+        return None
+
+    voiced = np.flatnonzero(frame_energies(samples) > threshold_db)
+    if len(voiced) * FRAME_MS < min_speech_ms:
+        return None
+
+    padding = padding_ms * SAMPLE_RATE // 1000
+    start = max(0, voiced[0] * FRAME_SAMPLES - padding)
+    end = min(len(samples), (voiced[-1] + 1) * FRAME_SAMPLES + padding)
+    return samples[start:end].tobytes(), end < len(samples)
+
+
+class VadStats:
+    """Per-meeting counters of the audio the voice-activity detector kept and skipped."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.skipped_chunks = 0
+        self.audio_seconds = 0.0
+        self.skipped_seconds = 0.0
+        self.trimmed_seconds = 0.0
+
+    def record(self, received_bytes: int, kept_bytes: int):
+        self.chunks += 1
+        self.audio_seconds += pcm_seconds(received_bytes)
+        if kept_bytes == 0:
+            self.skipped_chunks += 1
+            self.skipped_seconds += pcm_seconds(received_bytes)
+        else:
+            self.trimmed_seconds += pcm_seconds(received_bytes - kept_bytes)
+
+    def as_dict(self) -> dict:
+        return {
+            "chunks": self.chunks,
+            "skipped_chunks": self.skipped_chunks,
+            "audio_seconds": round(self.audio_seconds, 2),
+            "skipped_seconds": round(self.skipped_seconds, 2),
+            "trimmed_seconds": round(self.trimmed_seconds, 2),
+        }
@@ -4,62 +4,146 @@ import uuid
 import time
 import os
 import logging
-import wave
 import asyncio
 from fastapi import WebSocket, WebSocketDisconnect
-from openai import OpenAI
-from services.fais import query_faiss_index, delete_faiss_index
-from core.common import meetings  # Import shared `meetings` dictionary
+from services.openai_client import create_translation, create_chat_completion, stream_chat_completion
+from services.json_stream import JsonItemStream
+from services.fais import delete_faiss_index
+from services.context import build_context
+from services.session import MeetingSession, get_session, close_session
+from services.scheduler import get_scheduler, stop_scheduler
+from services.transcript_writer import transcript_writer
+from services.vad import trim_silence
+from services.transcription_pipeline import TranscriptionPipeline, RAW_PCM
+from services.audio_encoding import encode_for_upload
+from services.cache import TTLCache, SingleFlight, content_hash
+from services.framing import parse_frame, FrameError, FRAME_OPUS, BINARY_PROTOCOL, PROTOCOL_VERSION
+from core.common import meetings  # Import shared meeting broadcast hub
+from core.broadcast import Subscriber
+from core.config import settings
 from models.user import User
 from models.meeting import Meeting, MeetingStatus
 
-client = OpenAI()
-
-# Directory to save the audio recordings
+# Directory to archive the audio recordings when ARCHIVE_RECORDINGS is enabled
 SAVE_DIRECTORY = "recordings"
-os.makedirs(SAVE_DIRECTORY, exist_ok=True)
+if settings.ARCHIVE_RECORDINGS:
+    os.makedirs(SAVE_DIRECTORY, exist_ok=True)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def save_wav_file(wav_bytes, filepath):
-    """Save WAV bytes to a file with proper WAV format"""
+# Keep references to in-flight archive writes so they are not garbage collected
+archive_tasks = set()
+
+# Concurrent summary requests for the same transcript share one call, and results are reused until new speech arrives
+summary_flights = SingleFlight()
+summary_cache = TTLCache(settings.SUMMARY_CACHE_SIZE, settings.SUMMARY_CACHE_TTL_SECONDS)
+
+# Transcription pipelines of the connections on this worker, per meeting
+meeting_pipelines = {}
+# Meetings ended while participants are still connected here; their late audio and transcriptions are dropped
+ended_meetings = set()
+
+async def drain_meeting(meeting_id):
+    """Transcribe and publish everything every local participant of the meeting has sent so far"""
+    await asyncio.gather(*(pipeline.drain() for pipeline in list(meeting_pipelines.get(meeting_id, ()))))
+
+def write_recording(audio_bytes, filepath):
+    """Write encoded audio bytes to disk"""
     try:
-        channels = 1  # mono
-        sample_width = 2  # 16-bit
-        framerate = 16000  # 16kHz
-        
-        with wave.open(filepath, 'wb') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(sample_width)
-            wav_file.setframerate(framerate)
-            wav_file.writeframes(wav_bytes)
-        
-        return os.path.exists(filepath)
+        with open(filepath, "wb") as f:
+            f.write(audio_bytes)
     except Exception as e:
-        logger.error(f"Error saving WAV file: {e}")
-        return False
-
-def transcribe(audio_file_path):
-    """Transcribe audio using Whisper API"""
+        logger.error(f"Error archiving recording: {e}")
+
+def archive_recording(audio_bytes, extension="wav"):
+    """Write the recording to SAVE_DIRECTORY off the event loop, if archiving is enabled"""
+    if not settings.ARCHIVE_RECORDINGS:
+        return
+    filename = f"{uuid.uuid4()}_{int(time.time())}.{extension}"
+    task = asyncio.create_task(asyncio.to_thread(write_recording, audio_bytes, os.path.join(SAVE_DIRECTORY, filename)))
+    archive_tasks.add(task)
+    task.add_done_callback(archive_tasks.discard)
+
+def detect_speech(meeting_id, pcm_bytes):
+    """Return the voiced part of a PCM chunk and whether it ended in a pause, or None if it is silence, counting what was dropped"""
+    if not settings.VAD_ENABLED:
+        return pcm_bytes, False
+    speech = trim_silence(pcm_bytes, settings.VAD_THRESHOLD_DB, settings.VAD_MIN_SPEECH_MS, settings.VAD_PADDING_MS)
+    get_session(meeting_id).vad.record(len(pcm_bytes), len(speech[0]) if speech else 0)
+    return speech
+
+async def transcribe_utterance(meeting_id, audio_bytes, extension):
+    """Compress a raw PCM utterance in the configured upload format, then transcribe it"""
+    if meeting_id in ended_meetings:
+        return None
+    if extension == RAW_PCM:
+        pcm_size = len(audio_bytes)
+        audio_bytes, extension, encode_seconds = await asyncio.to_thread(
+            encode_for_upload, audio_bytes, settings.AUDIO_UPLOAD_FORMAT, settings.AUDIO_OPUS_BITRATE
+        )
+        get_session(meeting_id).encoding.record(pcm_size, len(audio_bytes), encode_seconds)
+    archive_recording(audio_bytes, extension)
+    return await transcribe(audio_bytes, f"audio.{extension}")
+
+async def transcribe(audio_bytes, filename="audio.wav"):
+    """Transcribe an in-memory audio file using Whisper API"""
     try:
-        with open(audio_file_path, "rb") as audio_file:
-            transcription = client.audio.translations.create(
-                model="whisper-1", 
-                file=audio_file
-            )        
+        transcription = await create_translation((filename, audio_bytes))
         return transcription.text
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         return None
 
-async def perform_analysis(transcription):
+def parse_json_response(response_text):
+    """Parse a GPT-4o reply that should contain a single JSON object"""
+    # Clean up the response text to extract valid JSON
+    response_text = response_text.strip()  # Remove leading/trailing whitespace
+    if response_text.startswith('```json') and response_text.endswith('```'):
+        response_text = response_text[8:-3].strip()  # Remove the code block markers
+
+    # Convert response to JSON for easier frontend display
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON format in response"}
+
+async def complete_json(prompt, on_item=None):
+    """Run the completion and parse its JSON reply.
+
+    When on_item is given and STREAM_RESULTS is enabled, the reply is streamed and every
+    completed top-level array item is passed to on_item(key, item) as soon as it parses.
+    """
+    if on_item is None or not settings.STREAM_RESULTS:
+        completion = await create_chat_completion(prompt)
+        # Access the content attribute correctly from the completion object
+        return parse_json_response(completion.choices[0].message.content)
+
+    scanner = JsonItemStream()
+    parts = []
+    async for delta in stream_chat_completion(prompt):
+        parts.append(delta)
+        for key, item in scanner.feed(delta):
+            await on_item(key, item)
+    return parse_json_response("".join(parts))
+
+def broadcast_partial(meeting_id, message_type):
+    """Build an on_item callback that forwards streamed items to the meeting"""
+    async def on_item(key, item):
+        await meetings.broadcast(meeting_id, {
+            "status": "success",
+            "type": message_type,
+            "key": key,
+            "item": item
+        })
+    return on_item
+
+async def perform_analysis(transcription, meeting_id, on_item=None):
     logger.info("BEGIN async analysis on the transcription")
 
     # Move blocking code to an async wrapper
-    relevant_chunks = query_faiss_index(transcription)
-    context = "\n".join(relevant_chunks)
+    context = await asyncio.to_thread(build_context, transcription, meeting_id)
     prompt = [
             {"role": "system", "content": "You are a helpful assistant."},
             {
@@ -104,30 +188,121 @@ async def perform_analysis(transcription):
     
 
     # Call OpenAI API for completion
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=prompt
-    )
+    return await complete_json(prompt, on_item)
+
+async def perform_incremental_analysis(session: MeetingSession, meeting_id, on_item=None):
+    """Update the previous analysis using only the speech added since it ran"""
+    position = session.segment_count
+    new_segments = session.since(session.analyzed_position)
+    if not new_segments and session.last_analysis is not None:
+        return session.last_analysis
+
+    logger.info(f"BEGIN incremental analysis on {len(new_segments)} new segments")
+    transcription = "\n".join(segment.render() for segment in new_segments)
+    context = await asyncio.to_thread(build_context, transcription, meeting_id)
+    previous_titles = json.dumps((session.last_analysis or {}).get("titles", []))
+    prompt = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {
+                "role": "user",
+                "content": f'''
+                You are maintaining titles and respective ideas, with a category for each idea, for an ongoing meeting. Below are a summary of the meeting so far, the titles produced previously, and only the newest part of the transcription. Update the titles using the new transcription, with a slight influence from the context text. Prioritize the transcription content by approximately 60%, while using the context as a 40% reference.
 
-    # Access the content attribute correctly from the completion object
-    response_text = completion.choices[0].message.content.strip()
+                Keep previous titles that are still relevant, extend their ideas with new ones, and add new titles for new topics. Ensure that you use a maximum of five distinct categories for ideas, reusing the previous categories where possible. If new ideas do not fit into existing categories, consolidate them into the closest relevant category rather than creating a new one.
 
-    # Clean up the response text to extract valid JSON
-    if response_text.startswith('```json') and response_text.endswith('```'):
-        response_text = response_text[8:-3].strip()  # Remove code block markers
+                You can create more than two suggestion at a time. Number of items in suggestions array can be ranging from 3-10.
 
-    # Convert the response to JSON format
-    try:
-        response_json = json.loads(response_text)
-    except json.JSONDecodeError:
-        response_json = {"error": "Invalid JSON format in response"}
+                Also rewrite the meeting summary so that it covers the new transcription as well, in at most 200 words.
+                \"\"\"
+                Meeting summary so far:
+                {session.rolling_summary or "The meeting has just started."}
+
+                Previous titles:
+                {previous_titles}
 
+                New transcription (Primary focus):
+                {transcription}
+
+                Context (Secondary reference):
+                {context}
+                \"\"\"
+
+                The result should strictly be in the following JSON format without any extra explanation, text, or comments:
+                {{
+                  "titles": [
+                    {{
+                        "title": "Title 1",
+                        "ideas": ["Idea 1", "Idea 2"],
+                        "category": "Category 1"
+                    }}
+                  ],
+                  "suggestions": [
+                     "Suggestion 1",
+                     "Suggestion 2"
+                  ],
+                  "summary": "Updated summary of the whole meeting"
+                }}
+                Ensure the output is valid JSON and contains only the structure provided.
+                '''
+            }
+        ]
+
+    response_json = await complete_json(prompt, on_item)
+    if "error" in response_json:
+        return response_json
+
+    # The rolling summary is internal state; clients only receive titles and suggestions
+    session.rolling_summary = response_json.pop("summary", session.rolling_summary)
+    session.last_analysis = response_json
+    session.analyzed_position = position
     return response_json
 
-def generate_structured_summary(transcription):
+async def analyze_meeting(session: MeetingSession, meeting_id, on_item=None):
+    if settings.ANALYSIS_MODE == "full":
+        return await perform_analysis(session.full_text(), meeting_id, on_item)
+    return await perform_incremental_analysis(session, meeting_id, on_item)
+
+async def run_periodic_analysis(meeting_id):
+    """Analyse the meeting and broadcast the result; driven by the meeting's AnalysisScheduler"""
+    output = await analyze_meeting(get_session(meeting_id), meeting_id, broadcast_partial(meeting_id, "analysis_partial"))
+    analysis_message = {
+        "status": "success",
+        "type": "analysis",
+        "output": output
+    }
+    await meetings.broadcast(meeting_id, analysis_message)
+
+async def generate_structured_summary(transcription, meeting_id, on_item=None, on_result=None):
+    """Summarise the transcript once for all concurrent callers; on_result runs inside the shared call, so only once"""
+    async def run():
+        output = await _generate_structured_summary(transcription, meeting_id, on_item)
+        if on_result is not None:
+            await on_result(output)
+        return output
+
+    key = f"{meeting_id}:{content_hash(transcription)}"
+    return await summary_flights.do(key, run)
+
+def broadcast_summary(meeting_id):
+    async def on_result(output):
+        summary_message = {
+            "status": "success",
+            "type": "summary",
+            "output": output
+        }
+        await meetings.broadcast(meeting_id, summary_message)
+    return on_result
+
+async def _generate_structured_summary(transcription, meeting_id, on_item=None):
     logger.info("BEGIN structured summary generation on the transcription")
-    relevant_chunks = query_faiss_index(transcription)
-    context = "\n".join(relevant_chunks)
+    context = await asyncio.to_thread(build_context, transcription, meeting_id)
+
+    cache_key = content_hash(transcription, context)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Returning cached structured summary")
+        return cached
+
     prompt = [
         {"role": "system", "content": "You are a helpful assistant."},
         {
@@ -160,77 +335,120 @@ def generate_structured_summary(transcription):
     ]
     
     # Call OpenAI API for completion
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=prompt
-    )
+    response_json = await complete_json(prompt, on_item)
+    if "error" not in response_json:
+        summary_cache.put(cache_key, response_json)
+    return response_json
 
-    # Access the content attribute correctly from the completion object
-    response_text = completion.choices[0].message.content
+async def receive_message(ws: WebSocket):
+    """Receive the next client message as either a parsed JSON dict or a binary audio frame"""
+    message = await ws.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
 
-    # Clean up the response text to extract valid JSON
-    response_text = response_text.strip()  # Remove leading/trailing whitespace
-    if response_text.startswith('```json') and response_text.endswith('```'):
-        response_text = response_text[8:-3].strip()  # Remove the code block markers
+    if message.get("bytes") is not None:
+        frame_type, sequence, payload = parse_frame(message["bytes"])
+        return {"type": "audio", "frame_type": frame_type, "sequence": sequence, "payload": payload}
+    return json.loads(message["text"])
 
-    # Convert response to JSON for easier frontend display
+async def realtime_transcription_using_whisper(subscriber: Subscriber, user: User, meetingId: str, protocol: str = None):
+    ws = subscriber.websocket
+    pipeline = None
     try:
-        response_json = json.loads(response_text)
-    except json.JSONDecodeError:
-        response_json = {"error": "Invalid JSON format in response"}
+        username = f"{user.first_name} {user.last_name}"
+        last_sequence = None
+
+        async def publish_transcription(meeting_id, transcription):
+            if meeting_id in ended_meetings:
+                # Publishing would recreate the closed session and scheduler
+                return
+            message = {
+                "status": "success",
+                "type": "transcription",
+                "text": transcription,
+                "user": username
+            }
 
-    return response_json
+            await meetings.broadcast(meeting_id, message)
+
+            segment = get_session(meeting_id).append(username, transcription)
+            transcript_writer.add(meeting_id, segment)
+            get_scheduler(meeting_id, run_periodic_analysis).notify(transcription)
+
+        # Audio is merged into utterances and transcribed concurrently, so receiving never waits on Whisper
+        pipeline = TranscriptionPipeline(
+            transcribe_utterance,
+            publish_transcription,
+            settings.TRANSCRIPTION_WORKERS,
+            settings.TRANSCRIPTION_MAX_PENDING,
+            settings.UTTERANCE_TARGET_SECONDS,
+            settings.UTTERANCE_IDLE_FLUSH_SECONDS
+        )
+        meeting_pipelines.setdefault(meetingId, set()).add(pipeline)
+
+        if protocol == BINARY_PROTOCOL:
+            # Acknowledge the negotiated framing; control messages stay JSON text frames
+            await meetings.send(subscriber, {"type": "protocol", "protocol": BINARY_PROTOCOL, "version": PROTOCOL_VERSION})
 
-async def realtime_transcription_using_whisper(ws: WebSocket, user: User, meetingId: str):
-    try:
-        complete_transcription = ''
-        t = 0
-        delta = 3
         while True:
             try:
-                data = await ws.receive_text()
-                message = json.loads(data)
-
-                meeting_id = message.get("meetingId")
+                try:
+                    message = await receive_message(ws)
+                except FrameError as e:
+                    logger.error(f"Invalid audio frame: {e}")
+                    await meetings.send(subscriber, {"error": "Invalid audio frame"})
+                    continue
+
+                # The meeting id names files on disk, so only the authenticated one from the URL is used
+                if message.get("meetingId", meetingId) != meetingId:
+                    await meetings.send(subscriber, {"error": "Message is for a different meeting"})
+                    continue
+                meeting_id = meetingId
+                if message.get("type") == "audio" and meeting_id in ended_meetings:
+                    continue
                 type = message.get("type")
                 audio_base64 = message.get("data")
+                pcm = None
+
+                if type == "audio" and "frame_type" in message:
+                    sequence = message["sequence"]
+                    if last_sequence is not None and sequence != last_sequence + 1:
+                        logger.info(f"Audio frame sequence jumped from {last_sequence} to {sequence}")
+                    last_sequence = sequence
 
-                if type == "audio" and audio_base64:
+                    if message["frame_type"] == FRAME_OPUS:
+                        await pipeline.add_audio(meeting_id, message["payload"], "ogg")
+                    else:
+                        pcm = message["payload"]
+                elif type == "audio" and audio_base64:
                     try:
                         wav_data = base64.b64decode(audio_base64)
                     except base64.binascii.Error as e:
                         logger.error(f"Failed to decode base64 audio: {e}")
-                        await ws.send_text(json.dumps({"error": "Invalid base64 audio data"}))
+                        await meetings.send(subscriber, {"error": "Invalid base64 audio data"})
                         continue
-
-                    filename = f"{uuid.uuid4()}_{int(time.time())}.wav"
-                    saved_audio_path = os.path.join(SAVE_DIRECTORY, filename)
-
-                    if save_wav_file(wav_data, saved_audio_path):
-                        transcription = transcribe(saved_audio_path)
-                        if transcription:
-                            message = {
-                                "status": "success",
-                                "type": "transcription",
-                                "text": transcription,
-                                "user": f"{user.first_name} {user.last_name}"
-                            }
-
-                            for client in meetings.get(meeting_id, []):
-                                await client["websocket"].send_text(json.dumps(message))
-
-                            complete_transcription += transcription
-                            t += 1
-
-                        os.remove(saved_audio_path)
+                    pcm = wav_data
+
+                if pcm is not None:
+                    # Silence is not worth a Whisper call (and tends to come back as hallucinated text),
+                    # but it does end the utterance being aggregated
+                    speech = detect_speech(meeting_id, pcm)
+                    if speech is None:
+                        await pipeline.pause()
                     else:
-                        await ws.send_text(json.dumps({"error": "Failed to save audio file"}))
+                        await pipeline.add_pcm(meeting_id, *speech)
                 elif type == "end_meeting":
-                    delete_faiss_index(os.path.join("indices", f"{meeting_id}.faiss"))
+                    # Publish every participant's last utterances, then drop anything that arrives later
+                    await drain_meeting(meeting_id)
+                    ended_meetings.add(meeting_id)
+                    await transcript_writer.close(meeting_id)
+                    stop_scheduler(meeting_id)
+                    await asyncio.to_thread(delete_faiss_index, meeting_id)
+                    close_session(meeting_id)
                     # Fetch the meeting by meeting_id and update its status
                     meeting = await Meeting.get(meeting_id)
                     if not meeting:
-                        await ws.send_text(json.dumps({"error": "Failed to save audio file"}))
+                        await meetings.send(subscriber, {"error": "Failed to save audio file"})
                     
                     # Update the meeting status to in_progress and add current user to participants
                     meeting.status = MeetingStatus.FINISHED
@@ -243,39 +461,33 @@ async def realtime_transcription_using_whisper(ws: WebSocket, user: User, meetin
                         "type": "end_meeting",
                         "message": "The meeting has been successfully ended."
                     }
-                    for client in meetings.get(meeting_id, []):
-                        await client["websocket"].send_text(json.dumps(end_meeting_message))
+                    await meetings.broadcast(meeting_id, end_meeting_message)
                     break
                 elif type == "generate_summary":
-                    output = generate_structured_summary(complete_transcription)
-                    summary_message = {
-                        "status": "success",
-                        "type": "summary",
-                        "output": output
-                    }
-                    for client in meetings.get(meeting_id, []):
-                        await client["websocket"].send_text(json.dumps(summary_message))
-                
-                # Perform periodic analysis
-                if t == delta:
-                    output = await perform_analysis(complete_transcription)
-                    analysis_message = {
-                        "status": "success",
-                        "type": "analysis",
-                        "output": output
-                    }
-
-                    for client in meetings.get(meeting_id, []):
-                        await client["websocket"].send_text(json.dumps(analysis_message))
-
-                    delta += delta
+                    await drain_meeting(meeting_id)
+                    # Participants asking at the same time share one summary and one broadcast
+                    await generate_structured_summary(
+                        get_session(meeting_id).full_text(),
+                        meeting_id,
+                        broadcast_partial(meeting_id, "summary_partial"),
+                        broadcast_summary(meeting_id)
+                    )
 
             except WebSocketDisconnect:
                 logger.info("Client disconnected")
                 break
             except Exception as e:
                 logger.error(f"Error processing audio: {e}")
-                await ws.send_text(json.dumps({"error": str(e)}))
+                await meetings.send(subscriber, {"error": str(e)})
                 break
     except Exception as e:
         logger.error(f"Connection error: {e}")
+    finally:
+        if pipeline is not None:
+            # Utterances already received are still transcribed and published
+            await pipeline.close()
+            pipelines = meeting_pipelines.get(meetingId, set())
+            pipelines.discard(pipeline)
+            if not pipelines:
+                meeting_pipelines.pop(meetingId, None)
+                ended_meetings.discard(meetingId)